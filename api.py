@@ -0,0 +1,169 @@
+"""
+Read-only JSON API (/api/v1): serializers and the payload cache.
+
+Each model has a field set mapping public field names to getters; clients
+pick a sparse subset with `?fields=a,b,c`. A payload - one distinct
+(endpoint, arguments, fields, host) - is serialized once per content
+generation and kept as bytes with an ETag and its compressed bodies, so a
+hit costs a stat of the generation file and a dict lookup: no database
+access, no JSON encoding and no compression.
+"""
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import url_for
+from cache import CacheEntry, generation
+
+JSON_MIMETYPE = 'application/json'
+
+
+def _timestamp(value):
+    # Stored as naive UTC
+    return value.isoformat() + 'Z' if value else None
+
+
+def _variants(variants_json, asset_url):
+    if not variants_json:
+        return []
+    return [{'url': asset_url(v['path']), 'width': v['width'], 'format': v['format']}
+            for v in json.loads(variants_json)]
+
+
+class FieldSet:
+    """Serializable fields of one model: {name: getter(obj, asset_url)}"""
+
+    def __init__(self, fields, default=None):
+        self.fields = fields
+        self.default = tuple(default or fields)
+
+    def select(self, raw):
+        """Field names requested by a ?fields= value (default set if empty)"""
+        if not raw:
+            return self.default
+        names = []
+        for name in raw.split(','):
+            name = name.strip()
+            if not name:
+                continue
+            if name not in self.fields:
+                raise ValueError(f"Unknown field '{name}'; available: {', '.join(self.fields)}")
+            if name not in names:
+                names.append(name)
+        return tuple(names) or self.default
+
+    def serialize(self, obj, names, asset_url):
+        return {name: self.fields[name](obj, asset_url) for name in names}
+
+
+IMAGE_FIELDS = FieldSet({
+    'id': lambda i, asset_url: i.id,
+    'url': lambda i, asset_url: asset_url(i.image_path),
+    'variants': lambda i, asset_url: _variants(i.variants, asset_url),
+    'display_order': lambda i, asset_url: i.display_order,
+})
+
+PROJECT_FIELDS = FieldSet({
+    'id': lambda p, asset_url: p.id,
+    'slug': lambda p, asset_url: p.slug,
+    'title': lambda p, asset_url: p.title,
+    'category': lambda p, asset_url: p.category.value,
+    'summary': lambda p, asset_url: p.preview_summary,
+    'intro': lambda p, asset_url: p.page_intro_text,
+    'image': lambda p, asset_url: asset_url(p.preview_image_path),
+    'image_variants': lambda p, asset_url: _variants(p.preview_variants, asset_url),
+    'url': lambda p, asset_url: url_for('project_detail', slug=p.slug, _external=True),
+    'images': lambda p, asset_url: [IMAGE_FIELDS.serialize(i, IMAGE_FIELDS.default, asset_url) for i in p.images],
+    'created_at': lambda p, asset_url: _timestamp(p.created_at),
+    'updated_at': lambda p, asset_url: _timestamp(p.updated_at),
+}, default=('id', 'slug', 'title', 'category', 'summary', 'image', 'image_variants', 'url',
+            'created_at', 'updated_at'))
+
+# The single-project endpoint includes the intro text and gallery by default
+PROJECT_DETAIL_FIELDS = FieldSet(PROJECT_FIELDS.fields)
+
+PUBLICATION_FIELDS = FieldSet({
+    'id': lambda p, asset_url: p.id,
+    'title': lambda p, asset_url: p.title,
+    'journal': lambda p, asset_url: p.journal,
+    'publication_date': lambda p, asset_url: p.publication_date,
+    'published_on': lambda p, asset_url: p.published_on.isoformat() if p.published_on else None,
+    'authors': lambda p, asset_url: p.authors,
+    'url': lambda p, asset_url: p.url,
+    'created_at': lambda p, asset_url: _timestamp(p.created_at),
+    'updated_at': lambda p, asset_url: _timestamp(p.updated_at),
+})
+
+EXPERIENCE_FIELDS = FieldSet({
+    'id': lambda e, asset_url: e.id,
+    'title': lambda e, asset_url: e.title,
+    'description': lambda e, asset_url: e.description,
+    'created_at': lambda e, asset_url: _timestamp(e.created_at),
+    'updated_at': lambda e, asset_url: _timestamp(e.updated_at),
+})
+
+
+class PayloadEntry(CacheEntry):
+    __slots__ = ('etag',)
+
+    def __init__(self, generation, body):
+        super().__init__(generation, body, JSON_MIMETYPE)
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+
+
+class PayloadCache:
+    """Serialized API payloads per content generation (LRU, per worker)"""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.max_entries = 1024
+        self.compress_min_size = 500
+        self.cors_origin = '*'
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('API_CACHE_MAX_ENTRIES', 1024)
+        self.compress_min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        self.cors_origin = app.config.get('API_CORS_ORIGIN', '*')
+        app.extensions['api_payload_cache'] = self
+
+    def _entry(self, key, build):
+        current = self.generation.current()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.generation == current:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        body = json.dumps(build(), ensure_ascii=False, separators=(',', ':')).encode()
+        entry = PayloadEntry(current, body)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, request, key, build):
+        """JSON response for `key`, calling build() only on a miss; 304 if the ETag matches"""
+        entry = self._entry(key, build)
+        response = entry.response(self.compress_min_size)
+        # Weak: the same validator covers every content-coding of the payload
+        response.set_etag(entry.etag, weak=True)
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        if self.cors_origin:
+            response.headers['Access-Control-Allow-Origin'] = self.cors_origin
+        return response.make_conditional(request)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+payload_cache = PayloadCache(generation)
@@ -1,43 +1,127 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, send_from_directory
+from flask import Flask, render_template, request, g, redirect, url_for, session, flash, abort, Response, jsonify
+from flask.cli import AppGroup
 from werkzeug.security import check_password_hash, generate_password_hash
-from werkzeug.utils import secure_filename
-from models import db, Project, ProjectImage, Publication, Experience, ProjectCategory, AboutPage, CV
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+from models import db, Project, ProjectImage, Publication, Experience, ProjectCategory, AboutPage, CV, Job
+from models import DEFAULT_ABOUT_CONTENT, DEFAULT_ABOUT_HTML
 from config import Config
+from cache import page_cache, fragment_cache, generation, invalidates_cache, after_content_write, conditional, Deferred
+from bootstrap import bootstrap, latest_version
+from images import variants_for_upload, build_variants, image_sources
+from uploads import store_upload, ingest_image, ingest_images, discard, release, reference_count, blob_digest, CAS_DIR
+from storage import storage, LocalStorage
+from assets import asset_manifest, IMMUTABLE_MAX_AGE
+from freeze import freeze_site, freezing
+from compression import compressor, precompress_directory
+from delivery import send_managed_file, send_managed_from_directory
+from metrics import metrics, query_budget
+from database import engine_profiles
+from jobs import job_queue
+from sweeper import sweep, by_project, storage_usage, human_size
+from pagination import keyset_page
+from search import search_index, KINDS as SEARCH_KINDS
+from api import payload_cache, PROJECT_FIELDS, PROJECT_DETAIL_FIELDS, PUBLICATION_FIELDS, EXPERIENCE_FIELDS
+import click
+import logging
 import os
 import re
 from datetime import datetime
+from urllib.parse import urljoin
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
-# Initialize database
+# Initialize database (engine profile PRAGMAs, read-replica routing that
+# stays on the primary while the last content write replicates)
 db.init_app(app)
+engine_profiles.init_app(app, db, last_write=generation.changed_at)
 
-# Ensure upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs('static/uploads', exist_ok=True)
+# Public pages are cached in memory until the next admin write; {% cache %}
+# fragments until a write to a model they show
+page_cache.init_app(app)
+fragment_cache.init_app(app)
+payload_cache.init_app(app)
+
+# Route timings, SQL and template time, exported at /admin/metrics
+metrics.init_app(app, db)
+
+# Slow admin-side work runs in `flask jobs worker` (or after the response with JOBS_INLINE)
+job_queue.init_app(app, generation=generation)
+
+# Uploads live on local disk or in an S3-compatible bucket (STORAGE_BACKEND)
+storage.init_app(app)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def gallery_uploads():
+    """Valid files from the gallery_images field, in upload order"""
+    return [file for file in request.files.getlist('gallery_images')
+            if file and file.filename and allowed_file(file.filename)]
+
+def enqueue_variants(*paths):
+    """Queue resized copies for newly stored uploads; their rows start without variants"""
+    for path in set(paths):
+        if path and path.startswith('uploads/'):
+            job_queue.enqueue('image-variants', {'path': path}, key=f'image-variants:{path}')
+
+def ingest_report(gallery):
+    """Per-file ingestion timings, appended to the admin's flash message"""
+    if not gallery:
+        return ''
+    timings = ', '.join(f"{image.filename} {image.seconds:.2f}s" for image in gallery)
+    app.logger.info('Ingested %d gallery images: %s', len(gallery), timings)
+    return f" Gallery: {len(gallery)} image(s) ingested ({timings})."
+
 def generate_slug(title):
     """Generate a URL-friendly slug from title"""
     slug = re.sub(r'[^\w\s-]', '', title.lower())
     slug = re.sub(r'[-\s]+', '-', slug)
     return slug[:200]
 
+def unique_slug(slug, exclude_id=None):
+    """slug, or slug-1, slug-2, ... if taken by another project (one query)"""
+    query = db.session.query(Project.slug).filter(Project.slug.startswith(slug, autoescape=True))
+    if exclude_id is not None:
+        query = query.filter(Project.id != exclude_id)
+    taken = {row.slug for row in query}
+    base_slug = slug
+    counter = 1
+    while slug in taken:
+        slug = f"{base_slug}-{counter}"
+        counter += 1
+    return slug
+
 def is_admin():
     """Check if user is logged in as admin"""
     return session.get('admin_logged_in', False)
 
+@app.before_request
+def mark_freezing():
+    """g.freezing: the request renders a page for the static export"""
+    g.freezing = freezing(request.environ)
+
 @app.template_filter('asset_url')
 def asset_url_filter(path):
     """Template filter to handle both graphics and static paths"""
     if path.startswith('graphics/'):
         filename = path.replace('graphics/', '')
         return url_for('serve_graphics', filename=filename)
-    else:
-        return url_for('static', filename=path)
+    if path.startswith('uploads/'):
+        # Straight to the bucket/CDN when storage has permanent public URLs
+        return storage.public_url(path) or url_for('static', filename=path)
+    return url_for('static', filename=path)
+
+@app.template_filter('filesize')
+def filesize_filter(size):
+    """Template filter formatting a byte count (e.g. 3.2 MB)"""
+    return human_size(size)
+
+@app.template_filter('image_sources')
+def image_sources_filter(variants):
+    """Template filter turning stored variants into [(mime type, srcset)] for <picture>"""
+    return image_sources(variants, asset_url_filter)
 
 def require_admin(f):
     """Decorator to require admin login"""
@@ -50,24 +134,39 @@ def require_admin(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def newest_update(*models):
+    """Latest updated_at across the given models (used as Last-Modified)"""
+    stamps = [db.session.query(func.max(model.updated_at)).scalar() for model in models]
+    stamps = [stamp for stamp in stamps if stamp]
+    return max(stamps) if stamps else None
+
+def paginate(query, columns, cursor, per_page):
+    """Keyset page of query after cursor; a malformed cursor is a 404"""
+    try:
+        return keyset_page(query, columns, cursor, per_page)
+    except ValueError:
+        abort(404)
+
+def admin_page(query, columns):
+    """Keyset page for an admin list, continuing after ?after=<cursor>"""
+    return paginate(query, columns, request.args.get('after'), app.config['ADMIN_PAGE_SIZE'])
+
 # ==================== PUBLIC ROUTES ====================
 
 @app.route('/')
+@query_budget(6)
+@conditional(lambda: newest_update(Project, Publication, Experience))
+@page_cache.cached
 def index():
     """Homepage with all sections"""
-    # Ensure database is initialized
-    try:
-        db.create_all()
-        if Project.query.count() == 0:
-            from seed import seed_database
-            seed_database()
-    except:
-        pass  # Database might already exist
-    
-    projects_medicine = Project.query.filter_by(category=ProjectCategory.MEDICINE).order_by(Project.created_at.desc()).all()
-    projects_creative = Project.query.filter_by(category=ProjectCategory.CREATIVE).order_by(Project.created_at.desc()).all()
-    publications = Publication.query.order_by(Publication.publication_date.desc()).all()
-    experiences = Experience.query.all()
+    # Each section's query runs only if its {% cache %} fragment has to be
+    # re-rendered; one query feeds both carousels, split by category here
+    projects = Deferred(lambda: Project.query.order_by(Project.created_at.desc()).all())
+    projects_medicine = Deferred(lambda: [p for p in projects if p.category == ProjectCategory.MEDICINE])
+    projects_creative = Deferred(lambda: [p for p in projects if p.category == ProjectCategory.CREATIVE])
+    publications = Deferred(lambda: Publication.query
+                            .order_by(*[column.desc() for column in Publication.list_key()]).all())
+    experiences = Deferred(lambda: Experience.query.order_by(Experience.created_at, Experience.id).all())
     
     return render_template('index.html',
                          projects_medicine=projects_medicine,
@@ -76,102 +175,247 @@ def index():
                          experiences=experiences)
 
 @app.route('/projects')
-def projects_archive():
-    """Archive page showing all projects in a grid"""
-    projects = Project.query.order_by(Project.created_at.desc()).all()
-    return render_template('projects_archive.html', projects=projects)
+@app.route('/projects/after/<cursor>')
+@query_budget(2)
+@conditional(lambda cursor=None: newest_update(Project))
+@page_cache.cached
+def projects_archive(cursor=None):
+    """Archive page showing projects in a grid, one keyset page at a time"""
+    page = paginate(Project.query, Project.archive_key(), cursor, app.config['ARCHIVE_PAGE_SIZE'])
+    return render_template('projects_archive.html', projects=page.items, next_cursor=page.next_cursor)
+
+@app.route('/projects/after/<cursor>/cards')
+@query_budget(2)
+@conditional(lambda cursor: newest_update(Project))
+@page_cache.cached
+def projects_archive_cards(cursor):
+    """Next archive page as JSON (rendered cards + next link) for infinite scroll"""
+    page = paginate(Project.query, Project.archive_key(), cursor, app.config['ARCHIVE_PAGE_SIZE'])
+    next_cursor = page.next_cursor
+    return jsonify(html=render_template('_archive_cards.html', projects=page.items),
+                   next=url_for('projects_archive_cards', cursor=next_cursor) if next_cursor else None,
+                   next_page=url_for('projects_archive', cursor=next_cursor) if next_cursor else None)
 
 @app.route('/project/<slug>')
+@query_budget(5)
+@conditional(lambda slug: newest_update(Project))
+@page_cache.cached
 def project_detail(slug):
     """Individual project detail page"""
-    project = Project.query.filter_by(slug=slug).first_or_404()
-    images = ProjectImage.query.filter_by(project_id=project.id).order_by(ProjectImage.display_order).all()
+    project = Project.query.options(selectinload(Project.images)).filter_by(slug=slug).first_or_404()
     
-    # Get all projects ordered by creation date (same order as archive)
-    all_projects = Project.query.order_by(Project.created_at.desc()).all()
+    # Next project in archive order (loops to first at the end)
+    next_project = project.next_in_archive()
     
-    # Find current project index and get next project
-    next_project = None
-    try:
-        current_index = next(i for i, p in enumerate(all_projects) if p.id == project.id)
-        # Get next project (loop to first if at end)
-        next_index = (current_index + 1) % len(all_projects)
-        next_project = all_projects[next_index]
-    except (StopIteration, IndexError):
-        # Fallback if something goes wrong
-        if len(all_projects) > 1:
-            next_project = all_projects[0] if all_projects[0].id != project.id else (all_projects[1] if len(all_projects) > 1 else None)
-    
-    return render_template('project_detail.html', project=project, images=images, next_project=next_project)
+    return render_template('project_detail.html', project=project, images=project.images, next_project=next_project)
 
 @app.route('/about')
+@query_budget(2)
+@conditional(lambda: newest_update(AboutPage))
+@page_cache.cached
 def about():
     """About page"""
     about_page = AboutPage.query.first()
-    # If no about page exists, use default content
-    if not about_page:
-        default_content = """I am a medical student with a deep passion for leveraging technology to solve complex problems in healthcare. 
-My journey combines rigorous medical training with expertise in machine learning, computer vision, and full-stack 
-web development.
-
-Through my research and projects, I've developed automated systems for medical image analysis, built predictive 
-models for patient outcomes, and created web applications that make healthcare data more accessible. I believe in 
-the power of interdisciplinary collaboration to drive innovation in medicine.
-
-When I'm not studying or coding, I enjoy exploring new technologies, contributing to open-source projects, and 
-sharing knowledge with the medical and tech communities. My goal is to bridge the gap between clinical practice 
-and cutting-edge technology to improve patient care."""
-        about_page = AboutPage(content=default_content)
-        db.session.add(about_page)
-        db.session.commit()
-    
-    # Split content by double newlines to create paragraphs, and handle single newlines within paragraphs
-    # First, normalize different newline formats
-    content = about_page.content.replace('\r\n', '\n').replace('\r', '\n')
-    # Split by double newlines for paragraphs
-    paragraphs = []
-    for para in content.split('\n\n'):
-        para = para.strip()
-        if para:
-            # Replace single newlines within paragraphs with <br> tags
-            para = para.replace('\n', '<br>')
-            paragraphs.append(para)
-    
-    return render_template('about.html', paragraphs=paragraphs)
+    # HTML was rendered when the page was saved
+    content_html = about_page.content_html if about_page else DEFAULT_ABOUT_HTML
+    return render_template('about.html', content_html=content_html)
 
-@app.route('/download-cv')
-def download_cv():
-    """Download CV file"""
+_cv_download = {'generation': None, 'target': None}
+
+def _cv_target_exists(target):
+    """Whether a resolved CV file is still there (remote storage answers for itself)"""
+    file_path, _, stored = target
+    if stored:
+        return storage.remote or os.path.exists(storage.local_file(file_path))
+    return os.path.exists(file_path)
+
+def resolve_cv_download():
+    """(path, download name, in storage) for the CV, resolved once per content generation"""
+    current = generation.current()
+    cached = _cv_download['target']
+    # A file removed without a content write (swept, deleted by hand) is resolved again
+    if _cv_download['generation'] == current and (cached is None or _cv_target_exists(cached)):
+        return cached
+    
+    target = None
     cv = CV.query.first()
     if cv:
-        # Handle both graphics/ and uploads/ paths
-        if cv.file_path.startswith('graphics/'):
-            # Graphics folder is at root level
-            file_path = cv.file_path
-        elif cv.file_path.startswith('uploads/'):
-            # Uploads are in static/uploads
-            file_path = os.path.join('static', cv.file_path)
-        else:
-            # Assume it's a relative path from root
-            file_path = cv.file_path
-        
-        # Check if file exists and send it
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True, download_name=cv.download_name)
+        if cv.file_path.startswith('uploads/'):
+            # Uploads are in storage (static/uploads or the bucket)
+            if storage.exists(cv.file_path):
+                target = (cv.file_path, cv.download_name, True)
+        elif os.path.exists(cv.file_path):
+            # graphics/ (at root level) or a path relative to the root
+            target = (cv.file_path, cv.download_name, False)
     
     # Fallback to default if no CV in database or file not found
     default_path = 'graphics/my_cv.pdf'
-    if os.path.exists(default_path):
-        return send_file(default_path, as_attachment=True, download_name='CV_Sundeep_Chakladar.pdf')
-    else:
-        # If default also doesn't exist, return 404
-        from flask import abort
+    if target is None and os.path.exists(default_path):
+        target = (default_path, 'CV_Sundeep_Chakladar.pdf', False)
+    
+    _cv_download.update(generation=current, target=target)
+    return target
+
+@app.route('/download-cv')
+@query_budget(1)
+def download_cv():
+    """Download CV file (resumable via Range requests)"""
+    target = resolve_cv_download()
+    if target is None:
         abort(404)
+    file_path, download_name, stored = target
+    if stored:
+        url = storage.url(file_path, download_name=download_name)
+        if url:
+            # Remote storage: the browser downloads straight from the bucket
+            return redirect(url)
+        file_path = storage.local_file(file_path)
+    return send_managed_file(file_path, as_attachment=True, download_name=download_name, max_age=0)
+
+def redirect_to_storage(path):
+    """Redirect to a remote storage backend's URL for an upload"""
+    response = redirect(storage.url(path))
+    # Presigned URLs expire, so browsers may reuse the redirect only for a while
+    response.cache_control.public = True
+    response.cache_control.max_age = storage.url_expiry // 2
+    return response
+
+@app.route('/static/uploads/cas/<path:filename>')
+def serve_upload_blob(filename):
+    """Serve a content-addressed upload: its digest is a strong ETag and it never changes"""
+    if storage.remote:
+        return redirect_to_storage(f'{CAS_DIR}/{filename}')
+    response = send_managed_from_directory(os.path.join('static', CAS_DIR), filename,
+                                           etag=blob_digest(filename), max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/static/uploads/<path:filename>')
+def serve_upload(filename):
+    """Serve uploads stored before content addressing (and image variants)"""
+    if storage.remote:
+        return redirect_to_storage(f'uploads/{filename}')
+    return send_managed_from_directory(app.config['UPLOAD_FOLDER'], filename, max_age=app.config['ASSET_MAX_AGE'])
 
 @app.route('/graphics/<path:filename>')
 def serve_graphics(filename):
-    """Serve graphics files"""
-    return send_from_directory('graphics', filename)
+    """Serve graphics files (ETag / Last-Modified from the file, 304 on revalidation)"""
+    return send_managed_from_directory('graphics', filename, max_age=app.config['ASSET_MAX_AGE'])
+
+@app.route('/search')
+@query_budget(1)
+def search():
+    """Full-text search page (ranked, prefix-matching, with highlighted snippets)"""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind') if request.args.get('kind') in SEARCH_KINDS else None
+    results = search_index.search(query, kind=kind, limit=app.config['SEARCH_RESULTS_LIMIT']) if query else []
+    return render_template('search.html', query=query, kind=kind, results=results)
+
+@app.template_filter('search_result_url')
+def search_result_url_filter(result):
+    """Link for a search result: project page, publication URL or the experiences section"""
+    if result.kind == 'project':
+        return url_for('project_detail', slug=result.ref)
+    if result.kind == 'publication':
+        return result.ref
+    return url_for('index', _anchor='experiences')
+
+# ==================== JSON API ====================
+
+def api_error(status, message):
+    """Abort with a JSON error body"""
+    response = jsonify(error=message)
+    response.status_code = status
+    abort(response)
+
+def api_fields(fieldset):
+    """Field names selected by ?fields= (400 for unknown fields)"""
+    try:
+        return fieldset.select(request.args.get('fields'))
+    except ValueError as e:
+        api_error(400, str(e))
+
+def absolute_asset_url(path):
+    return urljoin(request.host_url, asset_url_filter(path))
+
+def api_list(endpoint, query, columns, fieldset):
+    """Cached keyset page of query as {data, next}, continuing after ?after=<cursor>"""
+    fields = api_fields(fieldset)
+    after = request.args.get('after')
+    
+    def build():
+        try:
+            page = keyset_page(query, columns, after, app.config['API_PAGE_SIZE'])
+        except ValueError as e:
+            api_error(400, str(e))
+        next_url = None
+        if page.next_cursor:
+            next_url = url_for(endpoint, after=page.next_cursor, fields=request.args.get('fields'), _external=True)
+        return {'data': [fieldset.serialize(item, fields, absolute_asset_url) for item in page.items],
+                'next': next_url}
+    
+    return payload_cache.respond(request, (endpoint, after, fields, request.host_url), build)
+
+@app.route('/api/v1/projects')
+@query_budget(2)
+def api_projects():
+    """Projects, newest first"""
+    query = Project.query
+    if 'images' in api_fields(PROJECT_FIELDS):
+        query = query.options(selectinload(Project.images))
+    return api_list('api_projects', query, Project.archive_key(), PROJECT_FIELDS)
+
+@app.route('/api/v1/projects/<slug>')
+@query_budget(2)
+def api_project(slug):
+    """One project, including its intro text and gallery by default"""
+    fields = api_fields(PROJECT_DETAIL_FIELDS)
+    
+    def build():
+        project = Project.query.options(selectinload(Project.images)).filter_by(slug=slug).first()
+        if project is None:
+            api_error(404, f"No project '{slug}'")
+        return {'data': PROJECT_DETAIL_FIELDS.serialize(project, fields, absolute_asset_url)}
+    
+    return payload_cache.respond(request, ('api_project', slug, fields, request.host_url), build)
+
+@app.route('/api/v1/publications')
+@query_budget(1)
+def api_publications():
+    """Publications, newest first"""
+    return api_list('api_publications', Publication.query, Publication.list_key(), PUBLICATION_FIELDS)
+
+@app.route('/api/v1/search')
+@query_budget(1)
+def api_search():
+    """Ranked full-text search results, optionally limited to one ?kind="""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('kind') or None
+    if kind is not None and kind not in SEARCH_KINDS:
+        api_error(400, f"Unknown kind '{kind}'; available: {', '.join(SEARCH_KINDS)}")
+    if not query:
+        api_error(400, 'Missing ?q= search query')
+    
+    def build():
+        results = search_index.search(query, kind=kind, limit=app.config['SEARCH_RESULTS_LIMIT'])
+        return {'data': [{'kind': result.kind,
+                          'id': result.id,
+                          'title': result.title,
+                          'url': urljoin(request.host_url, search_result_url_filter(result)),
+                          'snippet': str(result.snippet),
+                          'rank': round(result.rank, 4)}
+                         for result in results]}
+    
+    return payload_cache.respond(request, ('api_search', ' '.join(query.split()).lower(), kind, request.host_url),
+                                 build)
+
+@app.route('/api/v1/experiences')
+@query_budget(1)
+def api_experiences():
+    """Experiences, newest first"""
+    return api_list('api_experiences', Experience.query, (Experience.created_at, Experience.id),
+                    EXPERIENCE_FIELDS)
 
 # ==================== ADMIN ROUTES ====================
 
@@ -198,29 +442,64 @@ def admin_logout():
     return redirect(url_for('index'))
 
 @app.route('/admin')
+@query_budget(5)
 @require_admin
 def admin_dashboard():
     """Admin dashboard"""
     project_count = Project.query.count()
     publication_count = Publication.query.count()
     experience_count = Experience.query.count()
+    recent_jobs = Job.query.order_by(Job.created_at.desc(), Job.id.desc()).limit(10).all()
     
     return render_template('admin/dashboard.html',
                          project_count=project_count,
                          publication_count=publication_count,
-                         experience_count=experience_count)
+                         experience_count=experience_count,
+                         cache_stats=page_cache.stats(),
+                         fragment_stats=fragment_cache.stats(),
+                         job_counts=job_queue.counts(),
+                         recent_jobs=recent_jobs,
+                         storage=storage_usage())
+
+@app.route('/admin/jobs/<int:job_id>/retry', methods=['POST'])
+@require_admin
+def admin_job_retry(job_id):
+    """Queue a failed background job again"""
+    job = Job.query.get_or_404(job_id)
+    response = redirect(url_for('admin_dashboard'))
+    if job.status != 'failed':
+        flash('Only failed jobs can be retried.', 'error')
+        return response
+    job_queue.retry(job)
+    db.session.commit()
+    flash(f'Job {job.id} ({job.task}) queued again.', 'success')
+    if job_queue.inline:
+        response.call_on_close(job_queue.run_pending_after_response)
+    return response
+
+@app.route('/admin/metrics')
+def admin_metrics():
+    """Prometheus metrics for all workers (admin session or METRICS_TOKEN bearer)"""
+    token = app.config.get('METRICS_TOKEN')
+    if not is_admin() and not (token and request.headers.get('Authorization') == f'Bearer {token}'):
+        if token or request.accept_mimetypes.best != 'text/html':
+            abort(401)
+        return redirect(url_for('admin_login'))
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # ==================== ADMIN: PROJECTS ====================
 
 @app.route('/admin/projects')
+@query_budget(1)
 @require_admin
 def admin_projects():
     """List all projects"""
-    projects = Project.query.order_by(Project.created_at.desc()).all()
-    return render_template('admin/projects/list.html', projects=projects)
+    page = admin_page(Project.query, Project.archive_key())
+    return render_template('admin/projects/list.html', projects=page.items, next_cursor=page.next_cursor)
 
 @app.route('/admin/projects/new', methods=['GET', 'POST'])
 @require_admin
+@invalidates_cache(Project)
 def admin_project_new():
     """Create new project"""
     if request.method == 'POST':
@@ -232,65 +511,59 @@ def admin_project_new():
         # Generate slug
         slug = generate_slug(title)
         # Ensure uniqueness
-        base_slug = slug
-        counter = 1
-        while Project.query.filter_by(slug=slug).first():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        
-        # Handle preview image upload
-        preview_image_path = 'graphics/test_image.png'  # Default
-        if 'preview_image' in request.files:
-            file = request.files['preview_image']
-            if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filename = f"{slug}-preview-{datetime.now().strftime('%Y%m%d%H%M%S')}-{filename}"
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                preview_image_path = f"uploads/{filename}"
+        slug = unique_slug(slug)
         
         project = Project(
             title=title,
             slug=slug,
             category=ProjectCategory[category.upper()],
             preview_summary=preview_summary,
-            preview_image_path=preview_image_path,
+            preview_image_path='graphics/test_image.png',  # Default
             page_intro_text=page_intro_text
         )
         
         db.session.add(project)
-        db.session.commit()
         
-        # Handle gallery images
-        if 'gallery_images' in request.files:
-            files = request.files.getlist('gallery_images')
-            for idx, file in enumerate(files):
+        # Preview and gallery images are written first, then inserted together
+        # with the project in a single transaction. Resizing happens in a job
+        preview, gallery = [], []
+        try:
+            # Handle preview image upload
+            if 'preview_image' in request.files:
+                file = request.files['preview_image']
                 if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    filename = f"{slug}-gallery-{idx}-{datetime.now().strftime('%Y%m%d%H%M%S')}-{filename}"
-                    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    file.save(filepath)
-                    
-                    image = ProjectImage(
-                        project_id=project.id,
-                        image_path=f"uploads/{filename}",
-                        display_order=idx
-                    )
-                    db.session.add(image)
+                    preview = [ingest_image(file)]
+                    project.preview_image_path = preview[0].path
+            
+            gallery = ingest_images(app, gallery_uploads())
+            project.images = [
+                ProjectImage(image_path=image.path, display_order=idx)
+                for idx, image in enumerate(gallery)
+            ]
+            search_index.index(project)
+            enqueue_variants(project.preview_image_path, *[image.path for image in gallery])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            discard(preview + gallery)
+            flash(f'Error creating project: {str(e)}', 'error')
+            return render_template('admin/projects/form.html', project=None)
         
-        db.session.commit()
-        flash('Project created successfully!', 'success')
+        flash('Project created successfully!' + ingest_report(gallery), 'success')
         return redirect(url_for('admin_projects'))
     
     return render_template('admin/projects/form.html', project=None)
 
 @app.route('/admin/projects/<int:project_id>/edit', methods=['GET', 'POST'])
+@query_budget(2)
 @require_admin
+@invalidates_cache(Project)
 def admin_project_edit(project_id):
     """Edit existing project"""
-    project = Project.query.get_or_404(project_id)
+    project = Project.query.options(selectinload(Project.images)).get_or_404(project_id)
     
     if request.method == 'POST':
+        preview, gallery = [], []
         try:
             project.title = request.form.get('title')
             category_value = request.form.get('category')
@@ -302,65 +575,62 @@ def admin_project_edit(project_id):
             # Update slug if title changed
             new_slug = generate_slug(project.title)
             if new_slug != project.slug:
-                base_slug = new_slug
-                counter = 1
-                while Project.query.filter_by(slug=new_slug).first() and Project.query.filter_by(slug=new_slug).first().id != project.id:
-                    new_slug = f"{base_slug}-{counter}"
-                    counter += 1
-                project.slug = new_slug
+                project.slug = unique_slug(new_slug, exclude_id=project.id)
             
             # Handle preview image update
+            replaced_path = None
             if 'preview_image' in request.files:
                 file = request.files['preview_image']
                 if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    filename = f"{project.slug}-preview-{datetime.now().strftime('%Y%m%d%H%M%S')}-{filename}"
-                    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    file.save(filepath)
-                    project.preview_image_path = f"uploads/{filename}"
+                    replaced_path = project.preview_image_path
+                    preview = [ingest_image(file)]
+                    project.preview_image_path = preview[0].path
+                    project.preview_variants = None
+                    enqueue_variants(project.preview_image_path)
             
-            # Handle new gallery images
-            if 'gallery_images' in request.files:
-                files = request.files.getlist('gallery_images')
-                existing_count = ProjectImage.query.filter_by(project_id=project.id).count()
-                for idx, file in enumerate(files):
-                    if file and file.filename and allowed_file(file.filename):
-                        filename = secure_filename(file.filename)
-                        filename = f"{project.slug}-gallery-{existing_count + idx}-{datetime.now().strftime('%Y%m%d%H%M%S')}-{filename}"
-                        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                        file.save(filepath)
-                        
-                        image = ProjectImage(
-                            project_id=project.id,
-                            image_path=f"uploads/{filename}",
-                            display_order=existing_count + idx
-                        )
-                        db.session.add(image)
+            # Handle new gallery images (written concurrently, appended after existing ones)
+            gallery = ingest_images(app, gallery_uploads())
+            if gallery:
+                last_order = db.session.query(func.max(ProjectImage.display_order)) \
+                    .filter(ProjectImage.project_id == project.id).scalar()
+                first_order = 0 if last_order is None else last_order + 1
+                db.session.add_all([
+                    ProjectImage(project_id=project.id, image_path=image.path, display_order=first_order + idx)
+                    for idx, image in enumerate(gallery)
+                ])
+                enqueue_variants(*[image.path for image in gallery])
             
             project.updated_at = datetime.utcnow()
+            search_index.index(project)
             db.session.commit()
-            flash('Project updated successfully!', 'success')
+            release(replaced_path)
+            flash('Project updated successfully!' + ingest_report(gallery), 'success')
             return redirect(url_for('admin_projects'))
         except Exception as e:
             db.session.rollback()
+            discard(preview + gallery)
             flash(f'Error updating project: {str(e)}', 'error')
             # Continue to render the form with error message
     
-    images = ProjectImage.query.filter_by(project_id=project.id).order_by(ProjectImage.display_order).all()
-    return render_template('admin/projects/form.html', project=project, images=images)
+    return render_template('admin/projects/form.html', project=project, images=project.images)
 
 @app.route('/admin/projects/<int:project_id>/delete', methods=['POST'])
 @require_admin
+@invalidates_cache(Project)
 def admin_project_delete(project_id):
     """Delete project"""
     project = Project.query.get_or_404(project_id)
+    stored_paths = [project.preview_image_path] + [image.image_path for image in project.images]
+    search_index.remove(project)
     db.session.delete(project)
     db.session.commit()
+    release(*stored_paths)
     flash('Project deleted successfully!', 'success')
     return redirect(url_for('admin_projects'))
 
 @app.route('/admin/projects/<int:project_id>/images/<int:image_id>/delete', methods=['POST'])
 @require_admin
+@invalidates_cache(Project)
 def admin_project_image_delete(project_id, image_id):
     """Delete project image"""
     image = ProjectImage.query.get_or_404(image_id)
@@ -368,22 +638,27 @@ def admin_project_image_delete(project_id, image_id):
         flash('Invalid image.', 'error')
         return redirect(url_for('admin_project_edit', project_id=project_id))
     
+    image_path = image.image_path
+    image.project.updated_at = datetime.utcnow()
     db.session.delete(image)
     db.session.commit()
+    release(image_path)
     flash('Image deleted successfully!', 'success')
     return redirect(url_for('admin_project_edit', project_id=project_id))
 
 # ==================== ADMIN: PUBLICATIONS ====================
 
 @app.route('/admin/publications')
+@query_budget(1)
 @require_admin
 def admin_publications():
     """List all publications"""
-    publications = Publication.query.order_by(Publication.publication_date.desc()).all()
-    return render_template('admin/publications/list.html', publications=publications)
+    page = admin_page(Publication.query, Publication.list_key())
+    return render_template('admin/publications/list.html', publications=page.items, next_cursor=page.next_cursor)
 
 @app.route('/admin/publications/new', methods=['GET', 'POST'])
 @require_admin
+@invalidates_cache(Publication)
 def admin_publication_new():
     """Create new publication"""
     if request.method == 'POST':
@@ -395,6 +670,7 @@ def admin_publication_new():
             url=request.form.get('url')
         )
         db.session.add(publication)
+        search_index.index(publication)
         db.session.commit()
         flash('Publication created successfully!', 'success')
         return redirect(url_for('admin_publications'))
@@ -403,6 +679,7 @@ def admin_publication_new():
 
 @app.route('/admin/publications/<int:pub_id>/edit', methods=['GET', 'POST'])
 @require_admin
+@invalidates_cache(Publication)
 def admin_publication_edit(pub_id):
     """Edit existing publication"""
     publication = Publication.query.get_or_404(pub_id)
@@ -414,6 +691,7 @@ def admin_publication_edit(pub_id):
         publication.authors = request.form.get('authors')
         publication.url = request.form.get('url')
         publication.updated_at = datetime.utcnow()
+        search_index.index(publication)
         db.session.commit()
         flash('Publication updated successfully!', 'success')
         return redirect(url_for('admin_publications'))
@@ -422,9 +700,11 @@ def admin_publication_edit(pub_id):
 
 @app.route('/admin/publications/<int:pub_id>/delete', methods=['POST'])
 @require_admin
+@invalidates_cache(Publication)
 def admin_publication_delete(pub_id):
     """Delete publication"""
     publication = Publication.query.get_or_404(pub_id)
+    search_index.remove(publication)
     db.session.delete(publication)
     db.session.commit()
     flash('Publication deleted successfully!', 'success')
@@ -433,14 +713,16 @@ def admin_publication_delete(pub_id):
 # ==================== ADMIN: EXPERIENCES ====================
 
 @app.route('/admin/experiences')
+@query_budget(1)
 @require_admin
 def admin_experiences():
     """List all experiences"""
-    experiences = Experience.query.order_by(Experience.created_at.desc()).all()
-    return render_template('admin/experiences/list.html', experiences=experiences)
+    page = admin_page(Experience.query, (Experience.created_at, Experience.id))
+    return render_template('admin/experiences/list.html', experiences=page.items, next_cursor=page.next_cursor)
 
 @app.route('/admin/experiences/new', methods=['GET', 'POST'])
 @require_admin
+@invalidates_cache(Experience)
 def admin_experience_new():
     """Create new experience"""
     if request.method == 'POST':
@@ -449,6 +731,7 @@ def admin_experience_new():
             description=request.form.get('description')
         )
         db.session.add(experience)
+        search_index.index(experience)
         db.session.commit()
         flash('Experience created successfully!', 'success')
         return redirect(url_for('admin_experiences'))
@@ -457,6 +740,7 @@ def admin_experience_new():
 
 @app.route('/admin/experiences/<int:exp_id>/edit', methods=['GET', 'POST'])
 @require_admin
+@invalidates_cache(Experience)
 def admin_experience_edit(exp_id):
     """Edit existing experience"""
     experience = Experience.query.get_or_404(exp_id)
@@ -465,6 +749,7 @@ def admin_experience_edit(exp_id):
         experience.title = request.form.get('title')
         experience.description = request.form.get('description')
         experience.updated_at = datetime.utcnow()
+        search_index.index(experience)
         db.session.commit()
         flash('Experience updated successfully!', 'success')
         return redirect(url_for('admin_experiences'))
@@ -473,9 +758,11 @@ def admin_experience_edit(exp_id):
 
 @app.route('/admin/experiences/<int:exp_id>/delete', methods=['POST'])
 @require_admin
+@invalidates_cache(Experience)
 def admin_experience_delete(exp_id):
     """Delete experience"""
     experience = Experience.query.get_or_404(exp_id)
+    search_index.remove(experience)
     db.session.delete(experience)
     db.session.commit()
     flash('Experience deleted successfully!', 'success')
@@ -485,6 +772,7 @@ def admin_experience_delete(exp_id):
 
 @app.route('/admin/about/edit', methods=['GET', 'POST'])
 @require_admin
+@invalidates_cache(AboutPage)
 def admin_about_edit():
     """Edit about page content"""
     about_page = AboutPage.query.first()
@@ -501,22 +789,7 @@ def admin_about_edit():
         flash('About page updated successfully!', 'success')
         return redirect(url_for('admin_dashboard'))
     
-    # If no about page exists, use default content
-    if not about_page:
-        default_content = """I am a medical student with a deep passion for leveraging technology to solve complex problems in healthcare. 
-My journey combines rigorous medical training with expertise in machine learning, computer vision, and full-stack 
-web development.
-
-Through my research and projects, I've developed automated systems for medical image analysis, built predictive 
-models for patient outcomes, and created web applications that make healthcare data more accessible. I believe in 
-the power of interdisciplinary collaboration to drive innovation in medicine.
-
-When I'm not studying or coding, I enjoy exploring new technologies, contributing to open-source projects, and 
-sharing knowledge with the medical and tech communities. My goal is to bridge the gap between clinical practice 
-and cutting-edge technology to improve patient care."""
-        content = default_content
-    else:
-        content = about_page.content
+    content = about_page.content if about_page else DEFAULT_ABOUT_CONTENT
     
     return render_template('admin/about/form.html', content=content)
 
@@ -524,6 +797,7 @@ and cutting-edge technology to improve patient care."""
 
 @app.route('/admin/cv/edit', methods=['GET', 'POST'])
 @require_admin
+@invalidates_cache(CV)
 def admin_cv_edit():
     """Edit CV file and download name"""
     cv = CV.query.first()
@@ -550,23 +824,13 @@ def admin_cv_edit():
                     return render_template('admin/cv/form.html', cv=cv)
                 
                 # Save the file
-                filename = secure_filename(file.filename)
-                filename = f"cv-{datetime.now().strftime('%Y%m%d%H%M%S')}-{filename}"
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                file_path = f"uploads/{filename}"
+                file_path = store_upload(file)
         
         # Update or create CV record
+        replaced_path = None
         if cv:
             if file_path:
-                # Delete old file if it's in uploads/ (not graphics/)
-                if cv.file_path.startswith('uploads/'):
-                    old_file_path = os.path.join('static', cv.file_path)
-                    if os.path.exists(old_file_path):
-                        try:
-                            os.remove(old_file_path)
-                        except:
-                            pass  # Ignore errors when deleting old file
+                replaced_path = cv.file_path
                 cv.file_path = file_path
             cv.download_name = download_name
             cv.updated_at = datetime.utcnow()
@@ -578,6 +842,8 @@ def admin_cv_edit():
             db.session.add(cv)
         
         db.session.commit()
+        # Delete the old file once nothing refers to it (never graphics/ defaults)
+        release(replaced_path)
         flash('CV updated successfully!', 'success')
         return redirect(url_for('admin_dashboard'))
     
@@ -586,13 +852,188 @@ def admin_cv_edit():
 # ==================== INITIALIZATION ====================
 
 def init_db():
-    """Initialize database tables and seed data if needed"""
+    """Create tables, apply pending migrations and seed data if needed"""
+    bootstrap(app)
+
+@app.cli.command('bootstrap')
+def bootstrap_command():
+    """Create tables, apply pending migrations and seed an empty database"""
+    init_db()
+    print('Database is at schema version', latest_version())
+
+@app.cli.command('search-reindex')
+def search_reindex_command():
+    """Rebuild the full-text search index from scratch (saves keep it current)"""
+    with app.app_context(), db.engine.begin() as connection:
+        search_index.create(connection)
+        count = search_index.rebuild(connection)
+    generation.bump()
+    click.echo(f'Indexed {count} documents')
+
+@app.cli.command('build-images')
+def build_images_command():
+    """Generate responsive variants for images uploaded before they existed"""
+    with app.app_context():
+        for project in Project.query.filter(Project.preview_variants.is_(None)):
+            project.preview_variants = variants_for_upload(app, project.preview_image_path)
+        for image in ProjectImage.query.filter(ProjectImage.variants.is_(None)):
+            image.variants = variants_for_upload(app, image.image_path)
+        db.session.commit()
+    generation.bump(Project)
+    print('Image variants generated.')
+
+@app.cli.command('freeze')
+@click.option('--incremental', is_flag=True, help='Only re-render pages whose content changed since the last export.')
+@click.option('--output', default=None, help='Output directory (defaults to FREEZE_OUTPUT).')
+def freeze_command(incremental, output):
+    """Export the public site as static files"""
+    rendered, removed, copied = freeze_site(app, incremental=incremental, output=output)
+    print(f'Rendered {len(rendered)} pages, removed {len(removed)}, copied {copied} asset files.')
+
+# ==================== BACKGROUND JOBS ====================
+
+@job_queue.task('image-variants', invalidates=[Project])
+def image_variants_job(payload):
+    """Generate resized copies of a stored upload and record them on every row showing it"""
+    path = payload['path']
+    if not reference_count(path):
+        return  # Released before the job ran
+    variants = build_variants(app, path)
+    now = datetime.utcnow()
+    Project.query.filter_by(preview_image_path=path) \
+        .update({'preview_variants': variants, 'updated_at': now}, synchronize_session=False)
+    ProjectImage.query.filter_by(image_path=path).update({'variants': variants}, synchronize_session=False)
+    # Gallery pages changed too: move their Last-Modified on
+    gallery_projects = db.select(ProjectImage.project_id).where(ProjectImage.image_path == path)
+    Project.query.filter(Project.id.in_(gallery_projects)).update({'updated_at': now}, synchronize_session=False)
+    if app.config['FREEZE_ON_SAVE']:
+        job_queue.enqueue('freeze-site', key='freeze-site')
+    db.session.commit()
+
+@job_queue.task('freeze-site', max_attempts=3)
+def freeze_site_job(payload):
+    """Re-render the static export pages affected by the latest saves"""
+    freeze_site(app, incremental=True)
+
+@job_queue.task('sweep-uploads', max_attempts=1)
+def sweep_uploads_job(payload):
+    """Delete uploaded files nothing references any more"""
+    sweep(app.config['UPLOAD_SWEEP_GRACE_HOURS'] * 3600)
+
+if app.config['UPLOAD_SWEEP_INTERVAL_HOURS']:
+    job_queue.schedule('sweep-uploads', app.config['UPLOAD_SWEEP_INTERVAL_HOURS'] * 3600)
+
+def enqueue_after_write(task, key):
+    """after_content_write callback: queue `task` once the admin's response is sent"""
+    def enqueue():
+        with app.app_context():
+            job_queue.enqueue(task, key=key)
+            db.session.commit()
+    return enqueue
+
+if app.config['FREEZE_ON_SAVE']:
+    # Keep the static export current: re-render just the affected pages after each admin save
+    after_content_write(enqueue_after_write('freeze-site', key='freeze-site'))
+
+if app.config['JOBS_INLINE']:
+    # No worker process: run what each admin write queued once its response is sent
+    after_content_write(job_queue.run_pending_after_response)
+
+jobs_cli = AppGroup('jobs', help='Background job queue.')
+
+@jobs_cli.command('worker')
+@click.option('--burst', is_flag=True, help='Exit once no job is due instead of waiting for more.')
+def jobs_worker_command(burst):
+    """Run queued jobs until stopped (SIGTERM lets the current job finish)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    with app.app_context():
+        job_queue.work(burst=burst)
+
+@jobs_cli.command('status')
+def jobs_status_command():
+    """Number of jobs per status"""
+    with app.app_context():
+        for status, count in job_queue.counts().items():
+            click.echo(f'{status:<10} {count}')
+
+@jobs_cli.command('retry-failed')
+def jobs_retry_failed_command():
+    """Queue every failed job again"""
     with app.app_context():
-        db.create_all()
-        # Check if database is empty and seed if needed
-        if Project.query.count() == 0:
-            from seed import seed_database
-            seed_database()
+        failed = Job.query.filter_by(status='failed').all()
+        for job in failed:
+            job_queue.retry(job)
+        db.session.commit()
+    click.echo(f'Queued {len(failed)} failed job(s) again')
+
+app.cli.add_command(jobs_cli)
+
+uploads_cli = AppGroup('uploads', help='Uploaded files.')
+
+@uploads_cli.command('sweep')
+@click.option('--dry-run', is_flag=True, help='Only report what would be deleted.')
+@click.option('--grace-hours', type=float, default=None,
+              help='Keep files modified this recently (defaults to UPLOAD_SWEEP_GRACE_HOURS).')
+@click.option('--verbose', '-v', is_flag=True, help='List every orphaned file.')
+def uploads_sweep_command(dry_run, grace_hours, verbose):
+    """Delete uploaded files no project, gallery image or CV references"""
+    if grace_hours is None:
+        grace_hours = app.config['UPLOAD_SWEEP_GRACE_HOURS']
+    with app.app_context():
+        report = sweep(grace_hours * 3600, dry_run=dry_run)
+    orphans = report.orphans if dry_run else report.deleted
+    verb = 'Reclaimable' if dry_run else 'Deleted'
+    click.echo(f"{verb}: {len(orphans)} files, {human_size(sum(o.size for o in orphans))}"
+               f" ({report.kept_recent} newer than {grace_hours:g}h kept)")
+    for project, files, size in by_project(orphans):
+        click.echo(f'  {project:<40} {files:>5} files {human_size(size):>10}')
+        if verbose:
+            for orphan in orphans:
+                if orphan.project == project:
+                    click.echo(f'      {orphan.path} ({human_size(orphan.size)})')
+    size, files = storage_usage(max_age=0)
+    click.echo(f'Uploads now use {human_size(size)} in {files} files')
+
+@uploads_cli.command('migrate-storage')
+@click.option('--source', default=None,
+              help='Directory containing uploads/ (defaults to the parent of UPLOAD_FOLDER).')
+@click.option('--dry-run', is_flag=True, help='Only report what would be copied.')
+def uploads_migrate_storage_command(source, dry_run):
+    """Copy local uploads into the configured storage backend (STORAGE_BACKEND)"""
+    source = LocalStorage(source or os.path.dirname(app.config['UPLOAD_FOLDER']))
+    if not storage.remote and os.path.abspath(source.root) == os.path.abspath(storage.root):
+        click.echo('Uploads are already stored there; set STORAGE_BACKEND to the target backend.')
+        return
+    copied = skipped = size = 0
+    for stored in source.list('uploads/'):
+        if stored.path.endswith('.tmp'):
+            continue  # Interrupted write
+        existing = storage.stat(stored.path)
+        # Re-runs only copy what is missing or changed
+        if existing is not None and existing.size == stored.size:
+            skipped += 1
+            continue
+        if not dry_run:
+            with open(source.local_file(stored.path), 'rb') as f:
+                storage.save(stored.path, f)
+        copied += 1
+        size += stored.size
+    verb = 'Would copy' if dry_run else 'Copied'
+    click.echo(f'{verb} {copied} files ({human_size(size)}); {skipped} already stored')
+
+app.cli.add_command(uploads_cli)
+
+@app.cli.command('compress-assets')
+def compress_assets_command():
+    """Write .gz / .br siblings for static text assets (also done at startup)"""
+    print(f'Compressed {precompress_directory(app.static_folder)} files.')
+
+# Fingerprint static/ and graphics/ once per process (in the master with --preload);
+# registered last so it can wrap both file-serving views
+asset_manifest.init_app(app, {'static': app.static_folder, 'serve_graphics': 'graphics'})
+
+# Precompress static text assets and gzip/brotli-encode HTML responses
+compressor.init_app(app)
 
 if __name__ == '__main__':
     init_db()
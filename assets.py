@@ -0,0 +1,106 @@
+"""
+Content-hashed asset fingerprinting.
+
+At startup every file under static/ and graphics/ is hashed once into a
+manifest mapping e.g. css/style.css -> css/style.1a2b3c4d5e.css. A URL
+default rewrites the filename whenever url_for('static', ...) or
+url_for('serve_graphics', ...) is built (which covers the asset_url
+filter), and the two views serve fingerprinted names with a one-year
+immutable Cache-Control: a changed file gets a new URL, so browsers never
+need to revalidate.
+
+static/uploads is left out: uploads appear at runtime, after the manifest
+is built, and their names are already unique per upload.
+"""
+import os
+import hashlib
+from delivery import send_managed_from_directory
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+EXCLUDED_DIRS = {'uploads'}
+# Precompressed siblings are served in place of their source, never by name
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+
+
+def _digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()[:10]
+
+
+def fingerprinted_name(filename, digest):
+    root, extension = os.path.splitext(filename)
+    return f"{root}.{digest}{extension}"
+
+
+def build_manifest(directory):
+    """{relative name: fingerprinted name} for every file under directory"""
+    manifest = {}
+    for root, dirs, files in os.walk(directory):
+        if root == directory:
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+        for name in files:
+            if name.endswith(COMPRESSED_SUFFIXES):
+                continue
+            full_path = os.path.join(root, name)
+            relative = os.path.relpath(full_path, directory).replace(os.sep, '/')
+            manifest[relative] = fingerprinted_name(relative, _digest(full_path))
+    return manifest
+
+
+class AssetManifest:
+    """Fingerprinted URLs for static/ and graphics/, built once per process"""
+
+    def __init__(self):
+        self.folders = {}
+        self.forward = {}
+        self.reverse = {}
+
+    def init_app(self, app, folders):
+        """folders maps endpoint name -> directory, e.g. {'static': 'static'}"""
+        app.extensions['asset_manifest'] = self
+        if not app.config.get('ASSET_FINGERPRINTS', True):
+            return
+        self.folders = dict(folders)
+        for endpoint, directory in self.folders.items():
+            manifest = build_manifest(directory)
+            self.forward[endpoint] = manifest
+            self.reverse[endpoint] = {fingerprinted: name for name, fingerprinted in manifest.items()}
+        app.url_defaults(self._rewrite_url)
+        for endpoint in self.folders:
+            app.view_functions[endpoint] = self._wrap_view(endpoint, app.view_functions[endpoint])
+
+    def _rewrite_url(self, endpoint, values):
+        manifest = self.forward.get(endpoint)
+        if manifest and 'filename' in values:
+            values['filename'] = manifest.get(values['filename'], values['filename'])
+
+    def _wrap_view(self, endpoint, view):
+        directory = os.path.abspath(self.folders[endpoint])
+        reverse = self.reverse[endpoint]
+
+        def serve_asset(filename):
+            original = reverse.get(filename)
+            if original is None:
+                # Plain (or stale) names keep working with the normal headers
+                return view(filename=filename)
+            response = send_managed_from_directory(directory, original, max_age=IMMUTABLE_MAX_AGE)
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+            return response
+        serve_asset.__name__ = view.__name__
+        serve_asset.__doc__ = view.__doc__
+        return serve_asset
+
+    def original_name(self, endpoint, filename):
+        """Source name for a (possibly fingerprinted) requested name"""
+        return self.reverse.get(endpoint, {}).get(filename, filename)
+
+    def url_name(self, endpoint, filename):
+        """Fingerprinted name for a file, or the name unchanged if unknown"""
+        return self.forward.get(endpoint, {}).get(filename, filename)
+
+
+asset_manifest = AssetManifest()
@@ -0,0 +1 @@
+"""Load benchmarks: synthetic datasets, a route driver and JSON reports (python -m benchmarks)"""
@@ -0,0 +1,242 @@
+"""
+Load benchmarks.
+
+    python -m benchmarks run --scale 10k [--concurrency 8] [--requests 200] [--gunicorn 4]
+    python -m benchmarks compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+    python -m benchmarks budgets --scale 10k
+    python -m benchmarks explain --scale 10k
+    python -m benchmarks replica --scale 100
+
+`run` builds (or reuses) a synthetic SQLite database at the given scale,
+drives every route and writes throughput, p50/p95/p99 latency and queries
+per request to benchmarks/results/<timestamp>-<commit>-<scale>.json.
+`compare` prints per-route deltas between two runs and exits non-zero if
+any route's p95 or query count regressed by more than --threshold percent.
+`budgets` requests every route once with a cold cache and exits non-zero if
+any runs more SQL statements than its @query_budget; running it at two
+scales shows the counts don't grow with the data. `explain` prints the
+query plan of every SELECT the public routes run and exits non-zero if any
+reads a table without an index or sorts without one. `replica` puts a
+snapshot of the database behind DATABASE_REPLICA_URL (a replica that never
+catches up), edits a publication and exits non-zero if the public pages
+rendered right after the edit, which fill the caches, don't show it.
+"""
+import os
+import sys
+import json
+import sqlite3
+import random
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _database(args):
+    return os.path.abspath(os.path.join(DATA_DIR, f'bench-{args.scale}.db'))
+
+
+def load_app(args):
+    """Import the app against the benchmark database for args.scale, building it if needed"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    database = _database(args)
+    if args.rebuild and os.path.exists(database):
+        os.remove(database)
+    fresh = not os.path.exists(database)
+
+    # Configuration is read at import time, so point the app at the benchmark
+    # database before importing it. Jobs stay queued: run inline, the upload
+    # sweep would delete every upload the synthetic rows don't reference
+    env = {'DATABASE_URL': f'sqlite:///{database}', 'JOBS_INLINE': '0'}
+    if getattr(args, 'no_page_cache', False):
+        env['PAGE_CACHE_ENABLED'] = '0'
+        env['FRAGMENT_CACHE_ENABLED'] = '0'
+    os.environ.update(env)
+
+    from app import app
+    from benchmarks.datasets import build_dataset
+
+    if fresh:
+        print(f'Building {args.scale} dataset in {database} ...')
+        build_dataset(app, args.scale)
+    random.seed(0)
+    return app, env
+
+
+def run(args):
+    from benchmarks import driver
+
+    app, env = load_app(args)
+    if args.gunicorn:
+        mode = f'gunicorn-{args.gunicorn}'
+        results = driver.run_gunicorn(app, args.requests, args.concurrency, args.gunicorn, env)
+    else:
+        mode = 'in-process'
+        results = driver.run_in_process(app, args.requests, args.concurrency)
+
+    report = {
+        'meta': {
+            'commit': _commit(),
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'scale': args.scale,
+            'mode': mode,
+            'concurrency': args.concurrency,
+            'requests_per_route': args.requests,
+            'page_cache': not args.no_page_cache,
+            'python': platform.python_version(),
+        },
+        'routes': results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.utcnow():%Y%m%d-%H%M%S}-{report['meta']['commit']}-{args.scale}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'route':28} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'errors':>7}")
+    for name, stats in results.items():
+        queries = stats['queries_per_request']
+        print(f"{name:28} {stats['throughput_rps']:9.1f} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} "
+              f"{stats['p99_ms']:9.2f} {'-' if queries is None else f'{queries:.1f}':>8} {stats['errors']:7}")
+    print(f'Results written to {output}')
+
+
+def _change(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    regressions = []
+    print(f"{'route':28} {'p95 ms':>19} {'change':>8} {'queries':>15} {'change':>8}")
+    for name, new in candidate['routes'].items():
+        old = baseline['routes'].get(name)
+        if old is None:
+            continue
+        p95_change = _change(old['p95_ms'], new['p95_ms'])
+        query_change = _change(old['queries_per_request'], new['queries_per_request'])
+        old_q, new_q = old['queries_per_request'], new['queries_per_request']
+        print(f"{name:28} {old['p95_ms']:8.2f} -> {new['p95_ms']:7.2f} "
+              f"{'' if p95_change is None else f'{p95_change:+7.1f}%':>8} "
+              f"{'-' if old_q is None else f'{old_q:.1f}':>6} -> {'-' if new_q is None else f'{new_q:.1f}':>5} "
+              f"{'' if query_change is None else f'{query_change:+7.1f}%':>8}")
+        for change in (p95_change, query_change):
+            if change is not None and change > args.threshold:
+                regressions.append(name)
+                break
+
+    if regressions:
+        print(f"Regressed by more than {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+def budgets(args):
+    from benchmarks import driver
+
+    app, _ = load_app(args)
+    over = 0
+    print(f"{'route':28} {'url':40} {'queries':>8} {'budget':>7}")
+    for check in driver.check_budgets(app):
+        failed = check['statements'] > check['budget'] or check['status'] >= 400
+        over += failed
+        print(f"{check['route']:28} {check['url'][:40]:40} {check['statements']:8} {check['budget']:7}"
+              f"{'  FAIL (HTTP %d)' % check['status'] if check['status'] >= 400 else '  OVER' if failed else ''}")
+    if over:
+        print(f'{over} request(s) over budget')
+        sys.exit(1)
+
+
+def explain(args):
+    from benchmarks import driver
+
+    app, _ = load_app(args)
+    unindexed = 0
+    for statement, lines, full_scans in driver.explain_public_queries(app):
+        unindexed += bool(full_scans)
+        print(('FULL SCAN  ' if full_scans else 'ok         ') + ' '.join(statement.split())[:110])
+        for line in lines:
+            print(f'    {line}')
+    if unindexed:
+        print(f'{unindexed} quer{"y" if unindexed == 1 else "ies"} without an index')
+        sys.exit(1)
+
+
+def replica(args):
+    from benchmarks import driver
+
+    snapshot = os.path.abspath(os.path.join(DATA_DIR, f'bench-{args.scale}-replica.db'))
+    # Engines connect lazily, so the snapshot can be taken after the dataset is built
+    os.environ['DATABASE_REPLICA_URL'] = f'sqlite:///{snapshot}'
+    app, _ = load_app(args)
+    with sqlite3.connect(_database(args)) as source, sqlite3.connect(snapshot) as target:
+        source.backup(target)
+    try:
+        checks = driver.check_replica_freshness(app)
+    finally:
+        os.remove(snapshot)
+    for check, passed in checks:
+        print(f"{'ok  ' if passed else 'FAIL'}  {check}")
+    if not all(passed for _, passed in checks):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Benchmark every route against a synthetic dataset')
+    run_parser.add_argument('--scale', default='100', help="Number of projects: 100, 10k, 100k or an integer")
+    run_parser.add_argument('--requests', type=int, default=200, help='Requests per route')
+    run_parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients')
+    run_parser.add_argument('--gunicorn', type=int, metavar='WORKERS', default=0,
+                            help='Drive real gunicorn workers over HTTP instead of the test client')
+    run_parser.add_argument('--no-page-cache', action='store_true', help='Measure uncached rendering (page and fragment caches off)')
+    run_parser.add_argument('--rebuild', action='store_true', help='Regenerate the dataset')
+    run_parser.add_argument('--output', help='Result file (default: benchmarks/results/...)')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=20.0,
+                                help='Percent increase in p95 or queries that counts as a regression')
+    compare_parser.set_defaults(handler=compare)
+
+    budgets_parser = commands.add_parser('budgets', help='Check every route against its @query_budget')
+    budgets_parser.add_argument('--scale', default='100', help="Number of projects: 100, 10k, 100k or an integer")
+    budgets_parser.add_argument('--rebuild', action='store_true', help='Regenerate the dataset')
+    budgets_parser.set_defaults(handler=budgets)
+
+    explain_parser = commands.add_parser('explain', help='Check public queries use indexes')
+    explain_parser.add_argument('--scale', default='100', help="Number of projects: 100, 10k, 100k or an integer")
+    explain_parser.add_argument('--rebuild', action='store_true', help='Regenerate the dataset')
+    explain_parser.set_defaults(handler=explain)
+
+    replica_parser = commands.add_parser('replica', help='Check caches never fill from a lagging replica')
+    replica_parser.add_argument('--scale', default='100', help="Number of projects: 100, 10k, 100k or an integer")
+    replica_parser.add_argument('--rebuild', action='store_true', help='Regenerate the dataset')
+    replica_parser.set_defaults(handler=replica)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
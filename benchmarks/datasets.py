@@ -0,0 +1,94 @@
+"""
+Synthetic datasets for load benchmarks.
+
+Bulk-inserts projects (with gallery images), publications and experiences
+into a fresh database using executemany batches, so even the 100k scale
+builds in seconds. Files aren't copied: every row points at the seed
+graphics/test_image.png.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+SCALES = {'100': 100, '10k': 10_000, '100k': 100_000}
+IMAGES_PER_PROJECT = 2
+BATCH_SIZE = 5_000
+
+LOREM = ('Automated analysis of clinical images with deep learning, validated against expert '
+         'annotations and deployed as a lightweight web service for day-to-day use.')
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_dataset(app, scale):
+    """Create the schema in app's (empty) database and fill it with `scale` projects"""
+    from bootstrap import bootstrap
+    from search import search_index
+    from richtext import to_html
+    from models import db, Project, ProjectImage, Publication, Experience, ProjectCategory, AboutPage, CV
+
+    count = SCALES[scale] if scale in SCALES else int(scale)
+    bootstrap(app, seed=False)
+    start = datetime(2020, 1, 1)
+    # Bulk inserts skip the model validators that render these
+    lorem_html = to_html(LOREM)
+
+    with app.app_context():
+        def projects():
+            for i in range(count):
+                created = start + timedelta(minutes=i)
+                yield {
+                    'id': i + 1,
+                    'category': ProjectCategory.MEDICINE if i % 2 == 0 else ProjectCategory.CREATIVE,
+                    'title': f'Synthetic Project {i}',
+                    'slug': f'synthetic-project-{i}',
+                    'preview_summary': LOREM[:90],
+                    'preview_image_path': 'graphics/test_image.png',
+                    'page_intro_text': LOREM,
+                    'page_intro_html': lorem_html,
+                    'created_at': created,
+                    'updated_at': created,
+                }
+
+        def images():
+            for i in range(count):
+                for order in range(IMAGES_PER_PROJECT):
+                    yield {'project_id': i + 1, 'image_path': 'graphics/test_image.png', 'display_order': order}
+
+        def publications():
+            for i in range(count):
+                published = start + timedelta(days=i % 3650)
+                yield {
+                    'title': f'Synthetic Publication {i}',
+                    'journal': 'Journal of Benchmarks',
+                    'publication_date': published.strftime('%Y-%m-%d'),
+                    'published_on': published.date(),
+                    'authors': 'Sundeep Chakladar, A. Coauthor',
+                    'url': f'https://example.com/publication/{i}',
+                    'created_at': published,
+                    'updated_at': published,
+                }
+
+        def experiences():
+            for i in range(min(count, 50)):
+                yield {'title': f'Synthetic Experience {i}', 'description': LOREM, 'description_html': lorem_html}
+
+        for model, rows in ((Project, projects()), (ProjectImage, images()),
+                            (Publication, publications()), (Experience, experiences())):
+            for batch in _batches(rows):
+                db.session.execute(insert(model), batch)
+        db.session.add(AboutPage(content=LOREM + '\n\n' + LOREM))
+        db.session.add(CV(file_path='graphics/my_cv.pdf', download_name='CV.pdf'))
+        db.session.commit()
+
+    with app.app_context(), db.engine.begin() as connection:
+        search_index.rebuild(connection)
+    return count
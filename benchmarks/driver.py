@@ -0,0 +1,342 @@
+"""
+Load driver: hits every public and admin route at a fixed concurrency.
+
+In-process mode uses one Flask test client per thread and counts SQL
+statements per request through a SQLAlchemy engine event. Gunicorn mode
+starts real workers on a local port and drives them over HTTP; query counts
+aren't observable from outside the server there, so they are reported as
+None.
+"""
+import os
+import sys
+import time
+import random
+import socket
+import threading
+import subprocess
+import http.client
+import statistics
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+ADMIN_PASSWORD = 'sundeepchakladar2003'
+
+
+def login(client):
+    """Log a test client in, consuming the login flash so shared pages stay cacheable"""
+    client.post('/admin/login', data={'password': ADMIN_PASSWORD})
+    client.get('/admin').close()
+    return client
+
+
+def routes(app):
+    """[(name, [urls])] covering every GET route, with sampled ids/slugs"""
+    from models import db, Project, Publication, Experience
+    from pagination import encode_cursor
+
+    with app.app_context():
+        project_count = db.session.query(Project.id).count()
+        sample_size = min(project_count, 20)
+        # Spread samples over the whole archive, not just the newest rows
+        offsets = sorted(random.sample(range(project_count), sample_size)) if project_count else []
+        slugs = [db.session.query(Project.slug).order_by(Project.id).offset(o).limit(1).scalar() for o in offsets]
+        project_ids = [db.session.query(Project.id).order_by(Project.id).offset(o).limit(1).scalar() for o in offsets]
+        # Deep archive pages: continue after each sampled project
+        cursors = [encode_cursor(db.session.query(Project.created_at, Project.id).filter_by(id=pid).one())
+                   for pid in project_ids]
+        publication_id = db.session.query(Publication.id).limit(1).scalar()
+        experience_id = db.session.query(Experience.id).limit(1).scalar()
+
+    table = [
+        ('index', ['/']),
+        ('projects_archive', ['/projects']),
+        ('projects_archive_cards', [f'/projects/after/{cursor}/cards' for cursor in cursors]),
+        ('project_detail', [f'/project/{slug}' for slug in slugs]),
+        ('about', ['/about']),
+        ('download_cv', ['/download-cv']),
+        ('serve_graphics', ['/graphics/test_image.png']),
+        ('api_projects', ['/api/v1/projects', '/api/v1/projects?fields=slug,title,images']),
+        ('api_project', [f'/api/v1/projects/{slug}' for slug in slugs]),
+        ('api_publications', ['/api/v1/publications']),
+        ('search', ['/search?q=synthetic', '/search?q=proj&kind=project']),
+        ('api_search', ['/api/v1/search?q=synthetic']),
+        ('api_experiences', ['/api/v1/experiences']),
+        ('admin_dashboard', ['/admin']),
+        ('admin_projects', ['/admin/projects']),
+        ('admin_project_edit', [f'/admin/projects/{pid}/edit' for pid in project_ids]),
+        ('admin_publications', ['/admin/publications']),
+        ('admin_experiences', ['/admin/experiences']),
+        ('admin_about_edit', ['/admin/about/edit']),
+        ('admin_cv_edit', ['/admin/cv/edit']),
+    ]
+    if publication_id:
+        table.append(('admin_publication_edit', [f'/admin/publications/{publication_id}/edit']))
+    if experience_id:
+        table.append(('admin_experience_edit', [f'/admin/experiences/{experience_id}/edit']))
+    return [(name, urls) for name, urls in table if urls]
+
+
+def summarize(latencies, errors, elapsed, queries):
+    ordered = sorted(latencies)
+
+    def percentile(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000 if ordered else None
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': len(latencies) / elapsed if elapsed else None,
+        'mean_ms': statistics.fmean(ordered) * 1000 if ordered else None,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'queries_per_request': statistics.fmean(queries) if queries else None,
+    }
+
+
+def _drive(urls, requests, concurrency, make_session, fetch):
+    """Issue `requests` GETs spread over `concurrency` threads"""
+    latencies, queries = [], []
+    errors = 0
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    def worker(count):
+        nonlocal errors
+        session = make_session()
+        for i in range(count):
+            url = urls[i % len(urls)]
+            started = time.perf_counter()
+            ok, statements = fetch(session, url)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if statements is not None:
+                    queries.append(statements)
+                errors += 0 if ok else 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, per_thread))
+    return summarize(latencies, errors, time.perf_counter() - started, queries)
+
+
+def run_in_process(app, requests, concurrency, warmup=True):
+    from sqlalchemy import event
+    from models import db
+
+    counter = threading.local()
+    with app.app_context():
+        engine = db.engine
+
+    def count_statement(*args):
+        counter.statements = getattr(counter, 'statements', 0) + 1
+    event.listen(engine, 'before_cursor_execute', count_statement)
+
+    def make_session():
+        return login(app.test_client())
+
+    def fetch(client, url):
+        counter.statements = 0
+        response = client.get(url)
+        response.close()
+        return response.status_code < 400, counter.statements
+
+    results = {}
+    try:
+        for name, urls in routes(app):
+            if warmup:
+                _drive(urls, min(len(urls), 5), 1, make_session, fetch)
+            results[name] = dict(_drive(urls, requests, concurrency, make_session, fetch), urls=urls[:3])
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+    return results
+
+
+def check_budgets(app):
+    """Cold-cache statement count of every URL against its route's @query_budget"""
+    from sqlalchemy import event
+    from models import db
+    from cache import generation
+    from metrics import budget_for
+
+    counter = {'statements': 0}
+    with app.app_context():
+        engine = db.engine
+
+    def count_statement(*args):
+        counter['statements'] += 1
+    event.listen(engine, 'before_cursor_execute', count_statement)
+
+    client = login(app.test_client())
+    checks = []
+    try:
+        for name, urls in routes(app):
+            with app.app_context():
+                budget = budget_for(name)
+            if budget is None:
+                continue
+            for url in urls:
+                # Start from a cold page cache and validator cache every time
+                generation.bump()
+                counter['statements'] = 0
+                response = client.get(url)
+                response.close()
+                checks.append({'route': name, 'url': url, 'status': response.status_code,
+                               'statements': counter['statements'], 'budget': budget})
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+    return checks
+
+
+def check_replica_freshness(app):
+    """[(check, passed)] for public renders right after an admin edit
+
+    DATABASE_REPLICA_URL must point at a snapshot taken before the edit: a
+    replica that never catches up. Renders that fill the caches under the
+    edit's generation must still show the edit.
+    """
+    from flask import g
+    from models import Publication
+    from database import engine_profiles
+
+    fields = ('title', 'journal', 'publication_date', 'authors', 'url')
+    with app.app_context():
+        # The first publication on the homepage and the first API page
+        publication = Publication.query.order_by(*[column.desc() for column in Publication.list_key()]).first()
+        publication_id = publication.id
+        original = {name: getattr(publication, name) or '' for name in fields}
+    edited = dict(original, title=f"{original['title']} (edited)")
+
+    public = app.test_client()
+    for url in ('/', '/api/v1/publications'):
+        public.get(url).close()  # Cached before the edit
+    admin = login(app.test_client())
+    checks = []
+    try:
+        admin.post(f'/admin/publications/{publication_id}/edit', data=edited).close()
+        for url in ('/', '/api/v1/publications'):
+            response = public.get(url)
+            checks.append((f'GET {url} right after the edit shows it', edited['title'] in response.get_data(as_text=True)))
+            response.close()
+        with app.test_request_context('/'):
+            engine_profiles.route_to_replica()
+            checks.append(('public reads stay on the primary while the edit replicates', not g.get('read_replica')))
+        catch_up, engine_profiles.catch_up_seconds = engine_profiles.catch_up_seconds, 0
+        try:
+            with app.test_request_context('/'):
+                engine_profiles.route_to_replica()
+                checks.append(('public reads use the replica once it has caught up', bool(g.get('read_replica'))))
+        finally:
+            engine_profiles.catch_up_seconds = catch_up
+    finally:
+        # Leave the dataset as it was
+        admin.post(f'/admin/publications/{publication_id}/edit', data=original).close()
+    return checks
+
+
+# One-row tables: reading them whole is as cheap as any index lookup
+SMALL_TABLES = {'about_page', 'cv', 'schema_version'}
+
+
+def _plan(connection, statement, parameters):
+    """Query plan lines and whether they read a table without an index"""
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+        lines = [row[3] for row in rows]
+        # A full-text MATCH reads the FTS index (a virtual table scan), and
+        # ranking its matches by relevance needs a sort whatever the indexes
+        full_text = any(' VIRTUAL TABLE INDEX ' in line for line in lines)
+        full_scans = [line for line in lines
+                      if (line.startswith('SCAN ') and ' USING ' not in line
+                          and ' VIRTUAL TABLE INDEX ' not in line
+                          and line.split()[1] not in SMALL_TABLES)
+                      or ('USE TEMP B-TREE' in line and not full_text)]
+    else:
+        lines = [row[0] for row in connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).all()]
+        full_scans = [line for line in lines
+                      if 'Seq Scan on ' in line and line.split('Seq Scan on ')[1].split()[0] not in SMALL_TABLES]
+    return lines, full_scans
+
+
+def explain_public_queries(app):
+    """Query plan of every distinct SELECT the public routes run on a cold cache"""
+    from sqlalchemy import event
+    from models import db
+    from cache import generation
+
+    statements = {}
+    table = routes(app)
+    with app.app_context():
+        engine = db.engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.setdefault(statement, parameters)
+    event.listen(engine, 'before_cursor_execute', capture)
+
+    client = app.test_client()
+    try:
+        for name, urls in table:
+            if name.startswith('admin_'):
+                continue
+            for url in urls[:3]:
+                generation.bump()
+                client.get(url).close()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+    with engine.connect() as connection:
+        return [(statement,) + _plan(connection, statement, parameters)
+                for statement, parameters in statements.items()]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_gunicorn(app, requests, concurrency, workers, env):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+         '--log-level', 'warning', 'wsgi:app'],
+        env=dict(os.environ, GUNICORN_ACCESS_LOG='', **env))
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.time() > deadline or process.poll() is not None:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.2)
+
+        def make_session():
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+            connection.request('POST', '/admin/login', body=f'password={ADMIN_PASSWORD}',
+                               headers={'Content-Type': 'application/x-www-form-urlencoded'})
+            response = connection.getresponse()
+            response.read()
+            cookie = response.getheader('Set-Cookie', '').split(';', 1)[0]
+            # Render the login flash so it doesn't ride along on every request
+            connection.request('GET', '/admin', headers={'Cookie': cookie})
+            response = connection.getresponse()
+            response.read()
+            cookie = (response.getheader('Set-Cookie') or cookie).split(';', 1)[0]
+            return connection, cookie
+
+        def fetch(session, url):
+            connection, cookie = session
+            connection.request('GET', quote(url), headers={'Cookie': cookie})
+            response = connection.getresponse()
+            response.read()
+            return response.status < 400, None
+
+        return {name: dict(_drive(urls, requests, concurrency, make_session, fetch), urls=urls[:3])
+                for name, urls in routes(app)}
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
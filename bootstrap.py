@@ -0,0 +1,160 @@
+"""
+Startup bootstrap: schema creation, versioned migrations and first-run seeding.
+
+Runs once per deployment - from init_db(), the gunicorn entry point (wsgi.py)
+or `flask bootstrap` - and never from the request path. Applied migrations
+are recorded in the schema_version table; a brand-new database is created
+from the models at the latest version, while a database that predates
+versioning is stamped at the baseline and upgraded from there.
+"""
+import os
+from datetime import datetime
+from sqlalchemy import inspect, func, text
+from models import db, Project, ProjectImage, Publication, Experience, AboutPage, SchemaVersion, parse_publication_date
+from richtext import to_html
+from cache import generation
+from search import search_index
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register an upgrade function taking an open connection"""
+    def register(upgrade):
+        MIGRATIONS.append((version, description, upgrade))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return upgrade
+    return register
+
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+
+def current_version(connection):
+    """Highest applied migration, or None for an unversioned database"""
+    return connection.execute(db.select(func.max(SchemaVersion.version))).scalar()
+
+
+def _record(connection, version, description):
+    connection.execute(SchemaVersion.__table__.insert().values(
+        version=version, description=description, applied_at=datetime.utcnow()))
+
+
+def _add_column(connection, table, name, ddl_type):
+    """ALTER TABLE ... ADD COLUMN, skipped if the column already exists"""
+    columns = {column['name'] for column in inspect(connection).get_columns(table)}
+    if name not in columns:
+        connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl_type}'))
+
+
+# ==================== MIGRATIONS ====================
+
+@migration(1, 'Baseline schema')
+def _baseline(connection):
+    """Tables are created by db.create_all(); nothing to alter"""
+
+
+@migration(2, 'Responsive image variant columns')
+def _image_variants(connection):
+    _add_column(connection, 'projects', 'preview_variants', 'TEXT')
+    _add_column(connection, 'project_images', 'variants', 'TEXT')
+
+
+@migration(3, 'Parsed publication dates and sort/filter indexes')
+def _dates_and_indexes(connection):
+    _add_column(connection, 'publications', 'published_on', 'DATE')
+    publications = Publication.__table__
+    rows = connection.execute(db.select(publications.c.id, publications.c.publication_date, publications.c.created_at)
+                              .where(publications.c.published_on.is_(None))).all()
+    for publication_id, date_text, created_at in rows:
+        published_on = parse_publication_date(date_text, fallback=(created_at or datetime.utcnow()).date())
+        connection.execute(publications.update().where(publications.c.id == publication_id)
+                           .values(published_on=published_on))
+    # create_all() only adds indexes along with new tables
+    for model in (Project, ProjectImage, Publication, Experience):
+        for index in model.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+
+@migration(4, 'Full-text search index')
+def _search_index(connection):
+    # bootstrap() has just created the (empty) index; fill it once
+    search_index.rebuild(connection)
+
+
+RICH_TEXT_COLUMNS = ((Project, 'page_intro_text', 'page_intro_html'),
+                     (Experience, 'description', 'description_html'),
+                     (AboutPage, 'content', 'content_html'))
+
+
+def _render_rich_text(connection):
+    """Re-render every stored *_html column from its source"""
+    for model, source, target in RICH_TEXT_COLUMNS:
+        table = model.__table__
+        rows = connection.execute(db.select(table.c.id, table.c[source])).all()
+        for row_id, value in rows:
+            connection.execute(table.update().where(table.c.id == row_id).values({target: to_html(value)}))
+
+
+@migration(5, 'Pre-rendered rich text columns')
+def _rich_text(connection):
+    for model, _, target in RICH_TEXT_COLUMNS:
+        _add_column(connection, model.__table__.name, target, 'TEXT')
+    _render_rich_text(connection)
+
+
+@migration(6, 'Background jobs table')
+def _jobs(connection):
+    """The jobs table is new, so db.create_all() has already created it"""
+
+
+@migration(7, 'Re-render rich text whose link URLs got emphasis tags')
+def _rich_text_links(connection):
+    _render_rich_text(connection)
+
+
+# ==================== BOOTSTRAP ====================
+
+def bootstrap(app, seed=True):
+    """Create tables, apply pending migrations and seed an empty database"""
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    with app.app_context():
+        preexisting = set(inspect(db.engine).get_table_names())
+        db.create_all()
+        with db.engine.begin() as connection:
+            search_index.create(connection)
+
+        with db.engine.begin() as connection:
+            version = current_version(connection)
+            if version is None:
+                if 'projects' in preexisting:
+                    version = 1
+                    _record(connection, version, MIGRATIONS[0][1])
+                else:
+                    version = latest_version()
+                    _record(connection, version, 'Created from models')
+
+        for migration_version, description, upgrade in MIGRATIONS:
+            if migration_version <= version:
+                continue
+            # One transaction per migration, so a failure leaves the
+            # database at the last fully applied version
+            with db.engine.begin() as connection:
+                upgrade(connection)
+                _record(connection, migration_version, description)
+            app.logger.info('Applied migration %s: %s', migration_version, description)
+
+        if seed and db.session.query(Project.id).first() is None:
+            from seed import seed_database
+            seed_database()
+            with db.engine.begin() as connection:
+                search_index.rebuild(connection)
+
+        # New code or schema: nothing cached under the previous deploy is valid
+        generation.bump()
+
+        # Don't hand pooled connections to forked workers
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
@@ -0,0 +1,431 @@
+"""
+In-process page cache for the public routes.
+
+Rendered pages are keyed by endpoint and view arguments and remember the
+content generation they were rendered under. Every admin write bumps the
+generation, which invalidates all cached pages at once. The generation lives
+in a small append-only file in the instance folder so that every worker on
+the host sees a bump immediately: its size *is* the generation, and appends
+are atomic, so concurrent bumps from different workers never collide.
+
+The same generation drives HTTP validators: `conditional` answers
+If-None-Match / If-Modified-Since with a 304 before the view (or the page
+cache) runs, using an ETag derived from the generation file's mtime and a
+Last-Modified taken from the newest relevant `updated_at`.
+
+Below page level, `{% cache key, deps %}` ... `{% endcache %}` caches a
+rendered template fragment. `deps` names the models it shows
+('Project', 'Publication', 'Experience', ...); each model has its own
+generation file next to the main one, bumped by writes declared with
+`invalidates_cache(Model)`, so a publication edit re-renders only the
+fragments that list publications. A bump without models invalidates every
+fragment.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from flask import g, request, session, make_response, Response
+from jinja2 import nodes
+from jinja2.ext import Extension
+from werkzeug.http import is_resource_modified
+from compression import negotiate_encoding, compress
+
+# Tag bumped by writes that don't say which models they touched
+ALL_MODELS = 'all'
+
+
+def _tag(model):
+    """Tag for a model class or model name"""
+    return model if isinstance(model, str) else model.__name__
+
+
+class ContentGeneration:
+    """Monotonic counter shared by all worker processes via the filesystem"""
+
+    def __init__(self):
+        self.path = None
+
+    def init_app(self, app):
+        os.makedirs(app.instance_path, exist_ok=True)
+        self.path = os.path.join(app.instance_path, 'content_generation')
+
+    def _tag_path(self, tag):
+        return f'{self.path}.{tag}'
+
+    def current(self, tag=None):
+        """Return the current generation, or one model tag's (one stat call, no reads)"""
+        try:
+            return os.stat(self._tag_path(tag) if tag else self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def changed_at(self):
+        """When the generation last advanced (the file's mtime), as an aware datetime"""
+        try:
+            return datetime.fromtimestamp(os.stat(self.path).st_mtime, timezone.utc)
+        except FileNotFoundError:
+            return None
+
+    def bump(self, *models):
+        """Advance the generation, invalidating everything cached under the old one
+
+        Fragments are invalidated only if they depend on one of `models`
+        (classes or names), or all of them when no models are given.
+        """
+        tags = [_tag(model) for model in models] or [ALL_MODELS]
+        for path in [self.path] + [self._tag_path(tag) for tag in tags]:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, b'.')
+            finally:
+                os.close(fd)
+
+
+class CacheEntry:
+    __slots__ = ('generation', 'body', 'mimetype', 'encoded')
+
+    def __init__(self, generation, body, mimetype):
+        self.generation = generation
+        self.body = body
+        self.mimetype = mimetype
+        # Compressed bodies by content-coding, filled in on first request
+        self.encoded = {}
+
+    def response(self, min_size):
+        """Response for this entry, compressed (once) if the client accepts it"""
+        encoding = negotiate_encoding() if len(self.body) >= min_size else None
+        if not encoding:
+            response = Response(self.body, mimetype=self.mimetype)
+        else:
+            body = self.encoded.get(encoding)
+            if body is None:
+                body = self.encoded[encoding] = compress(self.body, encoding)
+            response = Response(body, mimetype=self.mimetype)
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+class PageCache:
+    """Full-page cache for GET requests, invalidated by content generation"""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.enabled = True
+        self.max_entries = 512
+        self.compress_min_size = 500
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.generation.init_app(app)
+        self.enabled = app.config.get('PAGE_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', 512)
+        self.compress_min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        app.extensions['page_cache'] = self
+
+    def _cacheable_request(self):
+        return self.enabled and _is_shared_get()
+
+    def cached(self, f):
+        """Decorator serving a view from the cache until the next admin write"""
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not self._cacheable_request():
+                return f(*args, **kwargs)
+
+            key = _page_key(kwargs)
+            generation = self.generation.current()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.generation == generation:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.response(self.compress_min_size)
+                self.misses += 1
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            entry = CacheEntry(generation, response.get_data(), response.mimetype)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return entry.response(self.compress_min_size)
+        return decorated_function
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for this worker process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'generation': self.generation.current(),
+            }
+
+
+class FragmentCache:
+    """Rendered template fragments, LRU-bounded by count and size, invalidated per model"""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.enabled = True
+        self.max_entries = 256
+        self.max_bytes = 8 * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('FRAGMENT_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 256)
+        self.max_bytes = app.config.get('FRAGMENT_CACHE_MAX_BYTES', 8 * 1024 * 1024)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self
+        app.extensions['fragment_cache'] = self
+
+    def _stamp(self, tags):
+        """Generations the fragment is valid for: one stat per tag"""
+        return tuple(self.generation.current(tag) for tag in (ALL_MODELS,) + tags)
+
+    def fetch(self, key, models, render):
+        """Cached output for key, or render() it and keep it until one of `models` changes"""
+        if not self.enabled:
+            return render()
+        stamp = self._stamp(tuple(_tag(model) for model in models))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Rendered under `stamp`: a write landing meanwhile makes it stale on the next lookup
+        output = render()
+        if len(output) <= self.max_bytes:
+            with self._lock:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self.size -= len(previous[1])
+                self._entries[key] = (stamp, output)
+                self.size += len(output)
+                while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.size -= len(evicted)
+        return output
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """Hit/miss counters and size for this worker process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'size': self.size,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache key, deps %} ... {% endcache %}
+
+    `key` identifies the fragment within its template (a string, or a
+    list/tuple for fragments that vary, e.g. ['card', project.id]); `deps`
+    is a model name or a list of them, [] for chrome that only changes on
+    deploy. The body must not depend on the visitor or the request.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        deps = parser.parse_expression() if parser.stream.skip_if('comma') else nodes.List([])
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        args = [nodes.Const(parser.name), key, deps]
+        return nodes.CallBlock(self.call_method('_cached', args), [], [], body).set_lineno(lineno)
+
+    def _cached(self, template, key, deps, caller):
+        if isinstance(key, list):
+            key = tuple(key)
+        models = (deps,) if isinstance(deps, str) else tuple(deps)
+        return self.environment.fragment_cache.fetch((template, key), models, caller)
+
+
+class Deferred:
+    """Template value loaded on first use
+
+    Pass queries feeding {% cache %} fragments this way so a fragment served
+    from the cache skips its query too.
+    """
+
+    def __init__(self, load):
+        self._load = load
+        self._loaded = False
+        self._value = None
+
+    @property
+    def value(self):
+        if not self._loaded:
+            self._value = self._load()
+            self._loaded = True
+        return self._value
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __bool__(self):
+        return bool(self.value)
+
+
+generation = ContentGeneration()
+page_cache = PageCache(generation)
+fragment_cache = FragmentCache(generation)
+
+
+def _is_shared_get():
+    # Pages rendered with pending flash messages are per-visitor; static
+    # export renders differ from the live pages (see freeze.py)
+    return request.method in ('GET', 'HEAD') and '_flashes' not in session and not g.get('freezing')
+
+
+def _page_key(view_args):
+    return (request.endpoint, tuple(sorted(view_args.items())))
+
+
+_validators = OrderedDict()
+_validators_lock = threading.Lock()
+
+
+def _generation_stamp():
+    try:
+        return os.stat(generation.path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _stored_validators(key, stamp):
+    """(etag, last_modified) recorded for a page's last 200 under this generation, or None"""
+    with _validators_lock:
+        cached = _validators.get(key)
+        if cached is None:
+            return None
+        if cached[0] != stamp:
+            del _validators[key]
+            return None
+        _validators.move_to_end(key)
+        return cached[1], cached[2]
+
+
+def _store_validators(key, stamp, last_modified, view_args):
+    """Compute and remember (etag, last_modified) for a page that rendered with a 200"""
+    # The generation mtime is unique per edit and per deploy, so it keeps
+    # ETags from colliding after a redeploy resets the counter
+    etag = hashlib.sha1(repr((key, stamp)).encode()).hexdigest()[:20]
+    candidates = [generation.changed_at(), last_modified(**view_args)]
+    candidates = [c if c.tzinfo else c.replace(tzinfo=timezone.utc) for c in candidates if c]
+    modified = max(candidates) if candidates else None
+    with _validators_lock:
+        _validators[key] = (stamp, etag, modified)
+        _validators.move_to_end(key)
+        # Same bound as the page cache: keys come from URLs
+        while len(_validators) > page_cache.max_entries:
+            _validators.popitem(last=False)
+    return etag, modified
+
+
+def conditional(last_modified):
+    """Decorator adding ETag / Last-Modified and answering revalidations with 304
+
+    `last_modified` receives the view arguments and returns the newest
+    relevant `updated_at`; it runs once per content generation, so revalidating
+    clients cost a stat call and no queries. Validators are only recorded
+    after the view returned a 200, so a slug or cursor that doesn't resolve
+    is never answered with a 304.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not _is_shared_get():
+                return f(*args, **kwargs)
+
+            key, stamp = _page_key(kwargs), _generation_stamp()
+            validators = _stored_validators(key, stamp)
+            if validators is not None and not is_resource_modified(
+                    request.environ, etag=validators[0], last_modified=validators[1]):
+                etag, modified = validators
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if validators is None:
+                    etag, modified = _store_validators(key, stamp, last_modified, kwargs)
+                    if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+                        response = Response(status=304)
+                else:
+                    etag, modified = validators
+            # Weak: the same validator covers every content-coding of the page
+            response.set_etag(etag, weak=True)
+            response.last_modified = modified
+            # Let browsers keep the page but check back on every visit
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
+
+
+_write_listeners = []
+
+
+def after_content_write(callback):
+    """Register a callable to run after an admin write, once the response is sent"""
+    _write_listeners.append(callback)
+    return callback
+
+
+def invalidates_cache(*models):
+    """Decorator for admin write handlers: bump the content generation after a POST
+
+    `models` are the model classes the handler writes; fragments that
+    depend on other models stay cached.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            response = f(*args, **kwargs)
+            if request.method == 'POST':
+                generation.bump(*models)
+                if _write_listeners:
+                    response = make_response(response)
+                    for callback in _write_listeners:
+                        response.call_on_close(callback)
+            return response
+        return decorated_function
+    return decorator
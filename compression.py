@@ -0,0 +1,130 @@
+"""
+Response compression (gzip, plus brotli when the `brotli` package is installed).
+
+Static text assets are compressed once - at startup or with
+`flask compress-assets` - into .gz / .br siblings, and those siblings are
+served directly when the client accepts them. Rendered HTML is compressed
+on the fly; the page cache keeps the compressed bytes per encoding, so
+cached pages are compressed only once per content generation.
+"""
+import os
+import gzip
+from flask import request, send_file, current_app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.html', '.xml'}
+COMPRESSIBLE_MIMETYPES = {'text/html', 'text/css', 'text/plain', 'application/javascript',
+                          'text/javascript', 'application/json', 'image/svg+xml'}
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+EXCLUDED_DIRS = {'uploads'}
+
+
+def supported_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding():
+    """Best encoding the client accepts, or None for identity"""
+    return request.accept_encodings.best_match(supported_encodings())
+
+
+def compress(data, encoding, level='fast'):
+    """Compress bytes; 'fast' for per-request work, 'best' for build-time assets"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=5 if level == 'fast' else 11)
+    return gzip.compress(data, compresslevel=6 if level == 'fast' else 9, mtime=0)
+
+
+def precompress_directory(directory):
+    """Write .gz / .br siblings for compressible files that are new or changed"""
+    written = 0
+    for root, dirs, files in os.walk(directory):
+        if root == directory:
+            dirs[:] = [d for d in dirs if d not in EXCLUDED_DIRS]
+        for name in files:
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            source = os.path.join(root, name)
+            data = None
+            for encoding in supported_encodings():
+                target = source + SUFFIXES[encoding]
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                    continue
+                if data is None:
+                    with open(source, 'rb') as f:
+                        data = f.read()
+                tmp_target = f"{target}.tmp"
+                with open(tmp_target, 'wb') as f:
+                    f.write(compress(data, encoding, level='best'))
+                os.replace(tmp_target, target)
+                written += 1
+    return written
+
+
+class Compressor:
+    """Serves precompressed static siblings and compresses dynamic responses"""
+
+    def __init__(self):
+        self.min_size = 500
+        self.static_folder = None
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        self.static_folder = app.static_folder
+        if app.config.get('COMPRESS_STATIC_ON_STARTUP', True):
+            precompress_directory(self.static_folder)
+        app.after_request(self.after_request)
+        app.extensions['compressor'] = self
+
+    def _static_sibling(self, encoding):
+        manifest = current_app.extensions.get('asset_manifest')
+        filename = request.view_args.get('filename', '')
+        if manifest:
+            filename = manifest.original_name('static', filename)
+        path = os.path.join(self.static_folder, filename)
+        sibling = path + SUFFIXES[encoding]
+        if os.path.exists(sibling) and os.path.getmtime(sibling) >= os.path.getmtime(path):
+            return sibling
+        return None
+
+    def after_request(self, response):
+        if (response.status_code != 200 or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if not encoding:
+            return response
+
+        if response.direct_passthrough:
+            # A file response: swap in the precompressed sibling if there is one
+            if request.endpoint != 'static':
+                return response
+            sibling = self._static_sibling(encoding)
+            if sibling is None:
+                return response
+            compressed = send_file(sibling, mimetype=response.mimetype, conditional=False, etag=False)
+            for header in ('Cache-Control', 'ETag', 'Last-Modified', 'Expires'):
+                if header in response.headers:
+                    compressed.headers[header] = response.headers[header]
+            response.close()
+            response = compressed
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(compress(data, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        # Same validator for every encoding, so mark it weak
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compressor = Compressor()
@@ -1,5 +1,6 @@
 import os
 from datetime import timedelta
+from database import engine_options, REPLICA
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -10,9 +11,128 @@ class Config:
         database_url = database_url.replace('postgres://', 'postgresql://', 1)
     SQLALCHEMY_DATABASE_URI = database_url
     
+    # Engine tuning (database.PROFILES): 'web' for the app server, 'batch' for
+    # CLI commands and job workers, 'off' for driver defaults. DATABASE_POOL_SIZE
+    # overrides the profile's pool size (keep it >= gunicorn threads per worker)
+    DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'web')
+    database_pool_size = int(os.environ.get('DATABASE_POOL_SIZE', 0)) or None
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(database_url, DATABASE_PROFILE, database_pool_size)
+    
+    # Optional read replica for public GET requests
+    database_replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {}
+    if database_replica_url:
+        database_replica_url = database_replica_url.replace('postgres://', 'postgresql://', 1)
+        SQLALCHEMY_BINDS[REPLICA] = dict(engine_options(database_replica_url, DATABASE_PROFILE, database_pool_size),
+                                         url=database_replica_url)
+    # After a content write, public reads stay on the primary this long: pages
+    # rendered then fill caches keyed on the new content generation, so they
+    # must not come from a replica that hasn't replayed the write yet. Keep it
+    # above the replica's worst replication lag
+    DATABASE_REPLICA_CATCH_UP_SECONDS = float(os.environ.get('DATABASE_REPLICA_CATCH_UP_SECONDS', 30))
+    
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     ADMIN_PASSWORD_HASH = os.environ.get('ADMIN_PASSWORD_HASH') or 'pbkdf2:sha256:600000$default$hash'  # Will be set on first run
     UPLOAD_FOLDER = 'static/uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
-
+    
+    # Full-page cache for public routes (invalidated on every admin write)
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1') != '0'
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 512))
+    
+    # {% cache %} template fragments, invalidated per model; LRU bounded by
+    # count and by total size (characters of HTML)
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') != '0'
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 256))
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+    
+    # Browser cache lifetime for graphics and uploads; they still revalidate
+    # with If-None-Match / If-Modified-Since once it expires
+    ASSET_MAX_AGE = int(os.environ.get('ASSET_MAX_AGE', 24 * 60 * 60))
+    SEND_FILE_MAX_AGE_DEFAULT = ASSET_MAX_AGE
+    
+    # Hand file transfers (CV, graphics, uploads) to the front proxy:
+    # '' (serve from the worker), 'x-accel' (nginx) or 'x-sendfile' (Apache/lighttpd)
+    FILE_OFFLOAD = os.environ.get('FILE_OFFLOAD', '')
+    FILE_OFFLOAD_PREFIX = os.environ.get('FILE_OFFLOAD_PREFIX', '/_files/')
+    USE_X_SENDFILE = FILE_OFFLOAD == 'x-sendfile'
+    
+    # Serve static/ and graphics/ under content-hashed names with immutable caching
+    ASSET_FINGERPRINTS = os.environ.get('ASSET_FINGERPRINTS', '1') != '0'
+    
+    # Static-site export (`flask freeze`); FREEZE_ON_SAVE re-exports after admin edits
+    FREEZE_OUTPUT = os.environ.get('FREEZE_OUTPUT', 'build')
+    FREEZE_ON_SAVE = os.environ.get('FREEZE_ON_SAVE') == '1'
+    
+    # Resized copies generated for every preview and gallery upload
+    IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+    IMAGE_VARIANT_FORMATS = tuple(os.environ.get('IMAGE_VARIANT_FORMATS', 'avif,webp').split(','))
+    IMAGE_VARIANT_QUALITY = 80
+    
+    # Threads used to write and resize gallery uploads in one admin POST
+    GALLERY_INGEST_WORKERS = int(os.environ.get('GALLERY_INGEST_WORKERS', 4))
+    
+    # gzip/brotli: responses smaller than this are sent uncompressed
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_STATIC_ON_STARTUP = os.environ.get('COMPRESS_STATIC_ON_STARTUP', '1') != '0'
+    
+    # Per-endpoint request/SQL/template metrics at /admin/metrics. Workers write
+    # snapshots to instance/metrics every METRICS_FLUSH_INTERVAL seconds; a
+    # Prometheus scraper can authenticate with `Authorization: Bearer <METRICS_TOKEN>`
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # @query_budget overruns raise instead of only logging; unset follows debug mode
+    QUERY_BUDGET_STRICT = {'1': True, '0': False}.get(os.environ.get('QUERY_BUDGET_STRICT'))
+    
+    # Keyset page sizes: archive cards per page / infinite-scroll batch, admin list rows
+    ARCHIVE_PAGE_SIZE = int(os.environ.get('ARCHIVE_PAGE_SIZE', 24))
+    ADMIN_PAGE_SIZE = int(os.environ.get('ADMIN_PAGE_SIZE', 50))
+    
+    # /api/v1: items per page, cached payloads per worker, CORS origin ('' to disable)
+    API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+    API_CACHE_MAX_ENTRIES = int(os.environ.get('API_CACHE_MAX_ENTRIES', 1024))
+    API_CORS_ORIGIN = os.environ.get('API_CORS_ORIGIN', '*')
+    
+    # Results shown by /search and /api/v1/search
+    SEARCH_RESULTS_LIMIT = int(os.environ.get('SEARCH_RESULTS_LIMIT', 20))
+    
+    # Background jobs (`flask jobs worker`). JOBS_INLINE=1 runs them in the web
+    # process after the admin's response instead, for setups without a worker;
+    # it is the default unless STORAGE_BACKEND is 's3', since a worker on
+    # another host can't read uploads on the web server's disk.
+    # Failed jobs retry after JOBS_RETRY_BASE_SECONDS, doubling up to the max;
+    # a job still running after JOBS_LEASE_SECONDS is assumed dead and requeued
+    JOBS_INLINE = os.environ.get('JOBS_INLINE', '0' if os.environ.get('STORAGE_BACKEND') == 's3' else '1') == '1'
+    JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 1.0))
+    JOBS_LEASE_SECONDS = int(os.environ.get('JOBS_LEASE_SECONDS', 600))
+    JOBS_RETRY_BASE_SECONDS = int(os.environ.get('JOBS_RETRY_BASE_SECONDS', 10))
+    JOBS_RETRY_MAX_SECONDS = int(os.environ.get('JOBS_RETRY_MAX_SECONDS', 3600))
+    
+    # Orphaned upload sweeper: files younger than the grace period are kept;
+    # the worker sweeps every UPLOAD_SWEEP_INTERVAL_HOURS (0 to only sweep by hand)
+    UPLOAD_SWEEP_GRACE_HOURS = float(os.environ.get('UPLOAD_SWEEP_GRACE_HOURS', 24))
+    UPLOAD_SWEEP_INTERVAL_HOURS = float(os.environ.get('UPLOAD_SWEEP_INTERVAL_HOURS', 24))
+    
+    # Upload storage: 'local' (static/uploads) or 's3' (any S3-compatible
+    # bucket; needs boto3 and AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY).
+    # S3_ENDPOINT_URL points at MinIO, R2 or a local emulator; with
+    # S3_PUBLIC_URL (public bucket or CDN) pages link to objects directly,
+    # otherwise uploads are served by redirecting to presigned URLs
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_PREFIX = os.environ.get('S3_PREFIX', '')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')
+    S3_URL_EXPIRY = int(os.environ.get('S3_URL_EXPIRY', 3600))
+    S3_MULTIPART_THRESHOLD_MB = float(os.environ.get('S3_MULTIPART_THRESHOLD_MB', 8))
+    
+    # A job worker on another host bumps the content generation in its own
+    # instance folder; web processes check the jobs table this often for
+    # finished content jobs and bump theirs (0: off; on by default with S3
+    # storage and a worker)
+    CONTENT_SYNC_SECONDS = float(os.environ.get('CONTENT_SYNC_SECONDS',
+                                                5 if STORAGE_BACKEND == 's3' and not JOBS_INLINE else 0))
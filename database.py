@@ -0,0 +1,148 @@
+"""
+Database engine tuning profiles and read-replica routing.
+
+A profile (DATABASE_PROFILE) bundles the settings for one kind of process:
+
+- SQLite: PRAGMAs applied to every new connection. WAL lets readers carry
+  on while one worker writes, synchronous=NORMAL is durable across crashes
+  of the app (not of the OS) in WAL mode, and busy_timeout makes a writer
+  wait for the lock instead of failing with "database is locked".
+- PostgreSQL (and other servers): connection pool sizing, pre-ping so a
+  connection dropped by the server or a proxy is replaced rather than
+  failing a request, recycling, and a per-session statement timeout.
+
+With DATABASE_REPLICA_URL set, public GET requests read from the replica;
+admin pages, writes and the logged-in admin (who expects to see their own
+edits immediately) stay on the primary. So does everyone for
+DATABASE_REPLICA_CATCH_UP_SECONDS after any content write: the page,
+fragment, API and validator caches are keyed on the content generation,
+which moves as soon as the primary commits, and a render from a lagging
+replica would cache pre-edit rows under the new generation until the next
+write.
+"""
+import logging
+from datetime import datetime, timezone
+from flask import g, request, session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+
+PROFILES = {
+    # App server: many short reads from concurrent workers
+    'web': {
+        'sqlite_pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'cache_size': -32000,  # KiB, i.e. 32 MB per connection
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+        },
+        'pool': {'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 10,
+                 'pool_recycle': 1800, 'pool_pre_ping': True},
+        'statement_timeout_ms': 5000,
+    },
+    # CLI commands and background jobs: few connections, long statements
+    'batch': {
+        'sqlite_pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 30000,
+            'cache_size': -64000,
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+        },
+        'pool': {'pool_size': 2, 'max_overflow': 2, 'pool_timeout': 60,
+                 'pool_recycle': 1800, 'pool_pre_ping': True},
+        'statement_timeout_ms': 0,
+    },
+    # Driver defaults, no tuning
+    'off': {'sqlite_pragmas': {}, 'pool': {}, 'statement_timeout_ms': 0},
+}
+
+
+def _profile(name):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown DATABASE_PROFILE '{name}'; available: {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def engine_options(url, profile, pool_size=None):
+    """SQLAlchemy create_engine() options for `url` under a profile"""
+    settings = _profile(profile)
+    backend = make_url(url).get_backend_name()
+    if backend == 'sqlite':
+        # Pooling is left to SQLAlchemy's SQLite defaults; PRAGMAs are set on connect
+        return {}
+    options = dict(settings['pool'])
+    if pool_size and options:
+        options['pool_size'] = pool_size
+    if settings['statement_timeout_ms'] and backend == 'postgresql':
+        options['connect_args'] = {'options': f"-c statement_timeout={settings['statement_timeout_ms']}"}
+    return options
+
+
+class RoutingSession(Session):
+    """db.session that sends a request's reads to the replica when route_to_replica() chose it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context()
+                and g.get('read_replica') and REPLICA in self._db.engines):
+            return self._db.engines[REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class EngineProfiles:
+    """Applies the configured profile's SQLite PRAGMAs and replica routing"""
+
+    def __init__(self):
+        self.profile = 'web'
+        self.catch_up_seconds = 30
+        self.last_write = None
+
+    def init_app(self, app, db, last_write=None):
+        """`last_write` returns when content was last written (an aware datetime, or None)"""
+        self.profile = app.config.get('DATABASE_PROFILE', 'web')
+        self.catch_up_seconds = app.config.get('DATABASE_REPLICA_CATCH_UP_SECONDS', 30)
+        self.last_write = last_write
+        pragmas = _profile(self.profile)['sqlite_pragmas']
+        with app.app_context():
+            engines = dict(db.engines)
+        for engine in engines.values():
+            if engine.dialect.name == 'sqlite' and pragmas and engine.url.database not in (None, '', ':memory:'):
+                event.listen(engine, 'connect', self._pragma_setter(pragmas))
+        if REPLICA in engines:
+            app.before_request(self.route_to_replica)
+        app.extensions['engine_profiles'] = self
+
+    @staticmethod
+    def _pragma_setter(pragmas):
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f'PRAGMA {name} = {value}')
+            finally:
+                cursor.close()
+        return set_pragmas
+
+    def route_to_replica(self):
+        """Read from the replica for public GETs by anonymous visitors, once it has caught up"""
+        if (request.method in ('GET', 'HEAD')
+                and not (request.endpoint or '').startswith('admin_')
+                and not session.get('admin_logged_in')
+                and not self.replicating()):
+            g.read_replica = True
+
+    def replicating(self):
+        """Whether the last content write may not have reached the replica yet"""
+        written = self.last_write() if self.last_write else None
+        return (written is not None
+                and (datetime.now(timezone.utc) - written).total_seconds() < self.catch_up_seconds)
+
+
+engine_profiles = EngineProfiles()
@@ -0,0 +1,65 @@
+"""
+File delivery for the file-serving routes (CV, graphics, uploads).
+
+By default files are sent by the worker with full conditional and
+Range / If-Range support (resumable downloads). With FILE_OFFLOAD set, the
+transfer is handed to the front proxy so a slow client never holds a
+gunicorn worker:
+
+- 'x-accel'    nginx: X-Accel-Redirect to FILE_OFFLOAD_PREFIX + the path
+               relative to the app root, served from an `internal` location
+- 'x-sendfile' Apache / lighttpd: X-Sendfile with the absolute path
+               (Flask's USE_X_SENDFILE)
+
+The proxy then handles Range, If-Range and conditional requests itself.
+The static export's requests (`g.freezing`) are never offloaded: the
+exporter writes the response body, which an offload response leaves empty.
+"""
+import os
+import mimetypes
+from urllib.parse import quote
+from flask import current_app, request, g, send_file, abort
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file as send_file_body
+
+
+def send_managed_file(path, as_attachment=False, download_name=None, max_age=None, etag=True):
+    """send_file, or an offload response when FILE_OFFLOAD is 'x-accel'"""
+    if g.get('freezing'):
+        # flask.send_file always applies USE_X_SENDFILE; the exporter needs the bytes
+        return send_file_body(path, request.environ, as_attachment=as_attachment, download_name=download_name,
+                              max_age=max_age, etag=etag, response_class=current_app.response_class,
+                              _root_path=current_app.root_path)
+    if current_app.config.get('FILE_OFFLOAD') == 'x-accel':
+        return _accel_redirect(path, as_attachment, download_name, max_age)
+    # Range / If-Range and ETag / Last-Modified come from conditional=True;
+    # with USE_X_SENDFILE Flask adds the X-Sendfile header instead of the body
+    response = send_file(path, as_attachment=as_attachment, download_name=download_name,
+                         max_age=max_age, etag=etag, conditional=True)
+    # Werkzeug only sets this on 206s; advertise it up front so clients can resume
+    response.headers.setdefault('Accept-Ranges', 'bytes')
+    return response
+
+
+def send_managed_from_directory(directory, filename, **kwargs):
+    """send_from_directory counterpart: 404 for paths outside directory or missing files"""
+    path = safe_join(os.path.abspath(directory), filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    return send_managed_file(path, **kwargs)
+
+
+def _accel_redirect(path, as_attachment, download_name, max_age):
+    relative = os.path.relpath(os.path.abspath(path), current_app.root_path).replace(os.sep, '/')
+    prefix = current_app.config.get('FILE_OFFLOAD_PREFIX', '/_files/').rstrip('/')
+    mimetype = mimetypes.guess_type(download_name or path)[0] or 'application/octet-stream'
+
+    response = current_app.response_class(mimetype=mimetype)
+    response.headers['X-Accel-Redirect'] = f"{prefix}/{quote(relative)}"
+    if as_attachment:
+        response.headers.set('Content-Disposition', 'attachment',
+                             filename=download_name or os.path.basename(path))
+    if max_age is not None:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response
@@ -0,0 +1,208 @@
+"""
+Static-site export.
+
+Renders every public page into a directory tree that nginx or a CDN can
+serve without Flask (`try_files $uri $uri/index.html`), and copies
+graphics/, static/ and uploads alongside, under both plain and
+fingerprinted names. With S3 storage, uploads the pages link to under
+/static/uploads (no S3_PUBLIC_URL) and the CV are downloaded from the
+bucket into the export instead.
+
+Incremental runs compare a signature per page - built from `updated_at`,
+row counts and the next-project link - against the last export and
+re-render only pages whose signature changed; pages of deleted projects
+are removed. A change to templates or assets forces a full export.
+
+Pages are rendered with `g.freezing` set, which hides what only works
+against the live app (the Search link) and keeps those renders out of the
+page cache.
+"""
+import os
+import json
+import shutil
+import hashlib
+import threading
+from sqlalchemy import func
+from models import db, Project, Publication, Experience, AboutPage, CV
+from pagination import encode_cursor
+from storage import storage
+
+STATE_FILE = '.freeze-state.json'
+# WSGI environ key marking the exporter's requests (see `freezing()`)
+FREEZE_ENVIRON = 'portfolio.freezing'
+
+_lock = threading.Lock()
+
+
+def _hash(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _table_stamp(model):
+    """(row count, newest updated_at): catches edits as well as deletions"""
+    return db.session.query(func.count(model.id), func.max(model.updated_at)).one()
+
+
+def freezing(environ):
+    """Whether a request comes from the static export"""
+    return bool(environ.get(FREEZE_ENVIRON))
+
+
+def page_file(output, url):
+    relative = url.strip('/')
+    return os.path.join(output, relative, 'index.html') if relative else os.path.join(output, 'index.html')
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _copy_if_newer(source, destination):
+    if os.path.exists(destination) and os.path.getmtime(destination) >= os.path.getmtime(source):
+        return False
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    shutil.copy2(source, destination)
+    return True
+
+
+class Freezer:
+    def __init__(self, app, output):
+        self.app = app
+        self.output = output
+        self.state_path = os.path.join(output, STATE_FILE)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _build_signature(self):
+        """Templates and assets: any change means every page must be re-rendered"""
+        templates = []
+        for root, _, files in os.walk(self.app.template_folder):
+            for name in files:
+                path = os.path.join(root, name)
+                templates.append([os.path.relpath(path, self.app.template_folder), os.path.getmtime(path)])
+        manifest = self.app.extensions.get('asset_manifest')
+        return _hash([sorted(templates), manifest.forward if manifest else None])
+
+    def page_signatures(self):
+        """{url: signature} for every public page"""
+        rows = db.session.query(Project.slug, Project.title, Project.updated_at, Project.created_at, Project.id) \
+            .order_by(*Project.archive_order()).all()
+        projects = [[slug, title, updated_at] for slug, title, updated_at, _, _ in rows]
+
+        signatures = {}
+        for index, (slug, title, updated_at) in enumerate(projects):
+            next_slug, next_title, _ = projects[(index + 1) % len(projects)]
+            signatures[f'/project/{slug}'] = _hash([updated_at, next_slug, next_title])
+
+        # Archive pages, each also exported as the JSON cards fragment that
+        # infinite scroll fetches
+        per_page = self.app.config['ARCHIVE_PAGE_SIZE']
+        cursor = None
+        for start in range(0, max(len(rows), 1), per_page):
+            page = projects[start:start + per_page]
+            next_cursor = encode_cursor(rows[start + per_page - 1][3:]) if start + per_page < len(rows) else None
+            signature = _hash([page, next_cursor])
+            if cursor is None:
+                signatures['/projects'] = signature
+            else:
+                signatures[f'/projects/after/{cursor}'] = signature
+                signatures[f'/projects/after/{cursor}/cards'] = signature
+            cursor = next_cursor
+        signatures['/'] = _hash([projects, _table_stamp(Publication), _table_stamp(Experience)])
+        signatures['/about'] = _hash(_table_stamp(AboutPage))
+        signatures['/download-cv'] = _hash(_table_stamp(CV))
+        return signatures
+
+    def _render(self, client, url):
+        response = client.get(url, environ_base={FREEZE_ENVIRON: True})
+        if url == '/download-cv' and response.status_code in (302, 303, 307) and storage.remote:
+            # The app redirects to the CV's (expiring) object URL: copy the file itself
+            with storage.local_copy(CV.query.first().file_path) as source:
+                with open(source, 'rb') as f:
+                    _write_atomic(os.path.join(self.output, 'download-cv'), f.read())
+            return
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} returned {response.status_code}')
+        # The CV is a file, not a page: keep it at its own path
+        path = os.path.join(self.output, 'download-cv') if url == '/download-cv' else page_file(self.output, url)
+        _write_atomic(path, response.get_data())
+
+    def _copy_stored_uploads(self):
+        """Download uploads from remote storage that pages link to under /static/uploads"""
+        copied = 0
+        for stored in storage.list('uploads/'):
+            if storage.public_url(stored.path):
+                continue  # Pages link to the bucket / CDN directly
+            destination = os.path.join(self.output, 'static', *stored.path.split('/'))
+            if os.path.exists(destination) and os.path.getmtime(destination) >= stored.modified:
+                continue
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            with storage.local_copy(stored.path) as source:
+                shutil.copyfile(source, destination)
+            copied += 1
+        return copied
+
+    def _copy_assets(self):
+        """Mirror graphics/ and static/ (plain and fingerprinted names)"""
+        manifest = self.app.extensions.get('asset_manifest')
+        copied = 0
+        for endpoint, source_dir, url_prefix in (('serve_graphics', 'graphics', 'graphics'),
+                                                 ('static', self.app.static_folder, 'static')):
+            for root, _, files in os.walk(source_dir):
+                for name in files:
+                    source = os.path.join(root, name)
+                    relative = os.path.relpath(source, source_dir).replace(os.sep, '/')
+                    names = {relative}
+                    if manifest:
+                        names.add(manifest.url_name(endpoint, relative))
+                    for target in names:
+                        copied += _copy_if_newer(source, os.path.join(self.output, url_prefix, target))
+        if storage.remote:
+            copied += self._copy_stored_uploads()
+        return copied
+
+    def _remove_page(self, url):
+        path = page_file(self.output, url)
+        if os.path.exists(path):
+            os.remove(path)
+            try:
+                # Prune now-empty parents (e.g. projects/after/<cursor>/cards)
+                os.removedirs(os.path.dirname(path))
+            except OSError:
+                pass
+
+    def freeze(self, incremental=False):
+        """Export the site; returns (rendered urls, removed urls, copied files)"""
+        with _lock, self.app.app_context():
+            state = self._load_state() if incremental else {}
+            build = self._build_signature()
+            if state.get('build') != build:
+                state = {}
+            previous = state.get('pages', {})
+            signatures = self.page_signatures()
+
+            changed = [url for url, signature in signatures.items() if previous.get(url) != signature]
+            removed = [url for url in previous if url not in signatures]
+
+            client = self.app.test_client()
+            for url in changed:
+                self._render(client, url)
+            for url in removed:
+                self._remove_page(url)
+            copied = self._copy_assets()
+
+            _write_atomic(self.state_path, json.dumps({'build': build, 'pages': signatures}).encode())
+            return changed, removed, copied
+
+
+def freeze_site(app, incremental=False, output=None):
+    return Freezer(app, output or app.config['FREEZE_OUTPUT']).freeze(incremental=incremental)
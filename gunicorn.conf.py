@@ -0,0 +1,74 @@
+"""
+Production gunicorn settings (loaded automatically from the working directory).
+
+Every value can be overridden from the environment:
+
+- WEB_CONCURRENCY: worker processes (default 2 x CPUs + 1, at most 12)
+- GUNICORN_WORKER_CLASS: 'gthread' (default), 'sync', or 'gevent' for many
+  slow clients (requires `pip install gevent`)
+- GUNICORN_THREADS: threads per gthread worker (default 4; keep
+  DATABASE_POOL_SIZE at least this)
+- GUNICORN_TIMEOUT: seconds before a silent worker is killed (default 120,
+  enough for a large gallery upload)
+- GUNICORN_PRELOAD: '0' to import the app in each worker instead of once
+
+With preload_app the master imports the app, bootstraps the database and
+builds the asset manifest once; workers are forked with all of it in memory
+(copy-on-write). `kill -HUP <master>` replaces workers gracefully with the
+new configuration; to deploy new code without dropping requests use
+`kill -USR2` (start a new master) followed by `kill -TERM` on the old one.
+"""
+import os
+import time
+import multiprocessing
+
+_started = time.perf_counter()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 0)) or min(multiprocessing.cpu_count() * 2 + 1, 12)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))  # gevent
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None  # '' disables it
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    """Report how long the master took to load the app and start listening"""
+    server.log.info('Ready in %.2fs: %d %s worker(s)%s, preload %s', time.perf_counter() - _started,
+                    server.cfg.workers, server.cfg.worker_class_str,
+                    f' x {server.cfg.threads} threads' if server.cfg.worker_class_str == 'gthread' else '',
+                    'on' if server.cfg.preload_app else 'off')
+
+
+def pre_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+
+
+def post_fork(server, worker):
+    """Give each worker its own connections instead of sockets inherited from the master"""
+    if not server.cfg.preload_app:
+        return
+    from app import app
+    from models import db
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: leave the master's connections to the master
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    started = getattr(worker, 'forked_at', None)
+    if started is not None:
+        worker.log.info('Worker %s booted in %.3fs', worker.pid, time.perf_counter() - started)
+
+
+def on_reload(server):
+    server.log.info('Reloading: replacing workers gracefully')
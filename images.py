@@ -0,0 +1,140 @@
+"""
+Responsive image derivatives.
+
+Every preview and gallery upload is resized to a few widths and re-encoded
+(WebP by default, AVIF when Pillow supports it) at upload time. The list of
+variants is stored as JSON next to the original path on Project /
+ProjectImage, and the `image_sources` template filter turns it into
+<picture> sources with a srcset, so grids download a card-sized file
+instead of the full-resolution original.
+"""
+import io
+import os
+import re
+import json
+import logging
+from contextlib import nullcontext
+from storage import storage
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+RESIZABLE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+VARIANT_DIR = 'uploads/variants'
+
+
+def source_file(path):
+    """Context manager yielding a filesystem path with a stored asset's content
+
+    graphics/ defaults ship with the code; uploads come from storage (a
+    temporary download for remote backends).
+    """
+    if path.startswith('uploads/'):
+        return storage.local_copy(path)
+    return nullcontext(path)
+
+
+def _pillow_formats(formats):
+    """Requested formats this Pillow build can encode, or [] without Pillow"""
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning('Pillow is not installed; skipping image derivatives')
+        return []
+    # Encoders only register when Pillow was built with the codec
+    Image.init()
+    return [fmt for fmt in formats if fmt.upper() in Image.SAVE]
+
+
+def variant_stem(path):
+    return os.path.splitext(path.replace('/', '-'))[0]
+
+
+def variant_files(path):
+    """Stored paths of every variant generated for a stored path"""
+    prefix = f"{VARIANT_DIR}/{variant_stem(path)}-"
+    name = re.compile(re.escape(prefix) + r'\d+w\.\w+')
+    return [stored.path for stored in storage.list(prefix) if name.fullmatch(stored.path)]
+
+
+def generate_variants(path, widths, formats, quality=80):
+    """Write resized, re-encoded copies of an image and describe them
+
+    Returns a list of {'path', 'width', 'format'} dicts (paths relative to
+    static/, like the originals). Widths wider than the source are skipped;
+    the source width is used instead so small images still get a variant.
+    """
+    extension = path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+    formats = _pillow_formats(formats) if extension in RESIZABLE_EXTENSIONS else []
+    if not formats:
+        return []
+
+    from PIL import Image, ImageOps
+
+    stem = variant_stem(path)
+    if path.startswith('uploads/'):
+        stored = storage.stat(path)
+        if stored is None:
+            raise FileNotFoundError(f'{path} is not in storage')
+        source_modified = stored.modified
+    else:
+        source_modified = os.path.getmtime(path)
+
+    variants = []
+    with source_file(path) as source, Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA')
+        targets = sorted({min(width, original.width) for width in widths})
+        for width in targets:
+            height = max(1, round(original.height * width / original.width))
+            resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                variant_path = f"{VARIANT_DIR}/{stem}-{width}w.{fmt}"
+                # Re-uploads of a stored blob already have up-to-date variants
+                existing = storage.stat(variant_path)
+                if existing is None or existing.modified < source_modified:
+                    encoded = io.BytesIO()
+                    resized.save(encoded, fmt.upper(), quality=quality)
+                    encoded.seek(0)
+                    storage.save(variant_path, encoded, content_type=MIME_TYPES[fmt])
+                variants.append({'path': variant_path, 'width': width, 'format': fmt})
+    return variants
+
+
+def build_variants(app, path):
+    """Generate the configured variants for a stored path, as a JSON string (or None)
+
+    Raises OSError/ValueError for an unreadable image.
+    """
+    variants = generate_variants(path,
+                                 app.config['IMAGE_VARIANT_WIDTHS'],
+                                 app.config['IMAGE_VARIANT_FORMATS'],
+                                 app.config['IMAGE_VARIANT_QUALITY'])
+    return json.dumps(variants) if variants else None
+
+
+def variants_for_upload(app, path):
+    """build_variants(), logging failures instead of raising"""
+    try:
+        return build_variants(app, path)
+    except (OSError, ValueError) as e:
+        # A bad image shouldn't fail the upload; the original is still served
+        logger.warning('Could not generate variants for %s: %s', path, e)
+        return None
+
+
+def image_sources(variants_json, url_for_path):
+    """[(mime type, srcset)] per format, best format first"""
+    if not variants_json:
+        return []
+    by_format = {}
+    for variant in json.loads(variants_json):
+        by_format.setdefault(variant['format'], []).append(variant)
+    sources = []
+    for fmt in ('avif', 'webp'):
+        if fmt in by_format:
+            srcset = ', '.join(f"{url_for_path(v['path'])} {v['width']}w"
+                               for v in sorted(by_format[fmt], key=lambda v: v['width']))
+            sources.append((MIME_TYPES[fmt], srcset))
+    return sources
@@ -0,0 +1,299 @@
+"""
+Durable background jobs.
+
+Slow admin-side work (image variants, static export, ...) is recorded as a
+row in the `jobs` table instead of running inside the request. `enqueue()`
+adds the row to the caller's session, so a job exists exactly when the
+write that needs it commits. A separate process (`flask jobs worker`)
+claims due jobs and runs them.
+
+- Claiming is an UPDATE ... WHERE status = 'queued' that only one worker
+  can win, so several workers (or processes on several hosts sharing a
+  PostgreSQL database) never run a job twice.
+- A failing job is retried with exponential backoff up to max_attempts,
+  then left as 'failed' with its error for the dashboard.
+- A running job whose worker died is queued again once its lease expires.
+- A periodic task (`schedule()`) queues its next run, `interval` seconds
+  later, each time it finishes; a worker starting up (or, inline, an admin
+  save) queues the first.
+- An idempotency key names a unit of work; enqueueing it again while a
+  job for it is still waiting returns that job instead of adding another.
+  The key is released when a worker claims the job, so work enqueued after
+  that (e.g. a second save during a running export) gets its own job.
+
+With JOBS_INLINE=1 (development, or deployments without a worker process)
+pending jobs run in the web process after the admin's response is sent.
+Periodic tasks then only run when an admin saves after they are due; run
+their CLI counterpart (e.g. `flask uploads sweep`) from cron if saves are
+rare.
+
+A task registered with `invalidates=` bumps the content generation when it
+succeeds. That bump lands in the worker's instance folder; web processes on
+another host (CONTENT_SYNC_SECONDS) check the jobs table for newly finished
+content jobs after their responses and bump their own.
+"""
+import os
+import json
+import time
+import random
+import socket
+import signal
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+
+class JobQueue:
+    """Task registry plus enqueue/claim/run over the jobs table"""
+
+    def __init__(self):
+        self.tasks = {}
+        self.periodic = {}
+        self.app = None
+        self.inline = False
+        self.poll_interval = 1.0
+        self.lease = 600
+        self.retry_base = 10
+        self.retry_max = 3600
+        self.generation = None
+        self.sync_seconds = 0
+        self._synced_at = None
+        self._synced_up_to = datetime.utcnow()
+        self._sync_lock = threading.Lock()
+
+    def init_app(self, app, generation=None):
+        """`generation` (a ContentGeneration) is bumped for tasks that invalidate models"""
+        self.app = app
+        self.generation = generation
+        self.inline = app.config.get('JOBS_INLINE', False)
+        self.poll_interval = app.config.get('JOBS_POLL_INTERVAL', 1.0)
+        self.lease = app.config.get('JOBS_LEASE_SECONDS', 600)
+        self.retry_base = app.config.get('JOBS_RETRY_BASE_SECONDS', 10)
+        self.retry_max = app.config.get('JOBS_RETRY_MAX_SECONDS', 3600)
+        self.sync_seconds = app.config.get('CONTENT_SYNC_SECONDS', 0)
+        # Pages this process caches are rendered after it starts
+        self._synced_up_to = datetime.utcnow()
+        if self.sync_seconds and not self.inline:
+            app.after_request(self._sync_after_response)
+        app.extensions['jobs'] = self
+
+    def task(self, name, max_attempts=5, invalidates=()):
+        """Register a function(payload) as the task `name`
+
+        `invalidates` lists the models (classes or names) its writes change;
+        the content generation is bumped for them when it succeeds.
+        """
+        def register(f):
+            f.max_attempts = max_attempts
+            f.invalidates = tuple(invalidates)
+            self.tasks[name] = f
+            return f
+        return register
+
+    def schedule(self, task, interval):
+        """Run a registered task every `interval` seconds (while a worker runs)"""
+        if task not in self.tasks:
+            raise ValueError(f"Unknown task '{task}'")
+        self.periodic[task] = interval
+
+    # ---- producers ----
+
+    def enqueue(self, task, payload=None, key=None, delay=0):
+        """Add a job to the current session (committed with the caller's transaction)
+
+        With `key`, a job still waiting under that key is returned instead
+        of adding a second one.
+        """
+        if task not in self.tasks:
+            raise ValueError(f"Unknown task '{task}'")
+        if key is not None:
+            existing = Job.query.filter_by(idempotency_key=key).first()
+            if existing is not None:
+                return existing
+        job = Job(task=task, payload=json.dumps(payload or {}), idempotency_key=key,
+                  max_attempts=self.tasks[task].max_attempts,
+                  run_at=datetime.utcnow() + timedelta(seconds=delay))
+        try:
+            # A savepoint, so losing a race on the key leaves the caller's
+            # transaction intact
+            with db.session.begin_nested():
+                db.session.add(job)
+        except IntegrityError:
+            return Job.query.filter_by(idempotency_key=key).one()
+        return job
+
+    def retry(self, job):
+        """Queue a failed job again with a fresh set of attempts"""
+        job.status = 'queued'
+        job.attempts = 0
+        job.run_at = datetime.utcnow()
+        job.finished_at = None
+
+    # ---- workers ----
+
+    def _claim(self, worker_id):
+        """Lock the next due job for this worker, or None if there is none"""
+        now = datetime.utcnow()
+        # Jobs whose worker died mid-run go back to the queue
+        db.session.execute(db.update(Job)
+                           .where(Job.status == 'running', Job.locked_at < now - timedelta(seconds=self.lease))
+                           .values(status='queued', locked_by=None, locked_at=None))
+        candidates = db.session.execute(db.select(Job.id)
+                                        .where(Job.status == 'queued', Job.run_at <= now)
+                                        .order_by(Job.run_at, Job.id).limit(5)).scalars().all()
+        for job_id in candidates:
+            claimed = db.session.execute(db.update(Job)
+                                         .where(Job.id == job_id, Job.status == 'queued')
+                                         .values(status='running', locked_by=worker_id, locked_at=now,
+                                                 attempts=Job.attempts + 1, idempotency_key=None))
+            if claimed.rowcount == 1:
+                db.session.commit()
+                return db.session.get(Job, job_id)
+        db.session.commit()
+        return None
+
+    def _backoff(self, attempts):
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        return delay * random.uniform(0.8, 1.2)
+
+    def run_one(self, worker_id):
+        """Claim and run one due job; False if the queue had nothing due"""
+        job = self._claim(worker_id)
+        if job is None:
+            return False
+        started = time.perf_counter()
+        task = self.tasks.get(job.task)
+        try:
+            if task is None:
+                raise LookupError(f"Unknown task '{job.task}'")
+            task(json.loads(job.payload))
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(Job, job.id)
+            job.last_error = ''.join(traceback.format_exception_only(type(e), e)).strip()[:2000]
+            job.locked_by = job.locked_at = None
+            if job.attempts < job.max_attempts:
+                job.status = 'queued'
+                job.run_at = datetime.utcnow() + timedelta(seconds=self._backoff(job.attempts))
+                logger.warning('Job %s (%s) failed, attempt %d/%d, retrying at %s: %s', job.id, job.task,
+                               job.attempts, job.max_attempts, job.run_at, job.last_error)
+            else:
+                job.status = 'failed'
+                job.finished_at = datetime.utcnow()
+                logger.error('Job %s (%s) failed permanently: %s\n%s', job.id, job.task, job.last_error,
+                             traceback.format_exc())
+        else:
+            job.status = 'succeeded'
+            job.finished_at = datetime.utcnow()
+            job.last_error = None
+            logger.info('Job %s (%s) succeeded in %.2fs', job.id, job.task, time.perf_counter() - started)
+        if job.task in self.periodic and job.status != 'queued':
+            self.enqueue(job.task, key=f'schedule:{job.task}', delay=self.periodic[job.task])
+        db.session.commit()
+        if job.status == 'succeeded' and task.invalidates and self.generation:
+            self.generation.bump(*task.invalidates)
+        return True
+
+    def ensure_scheduled(self):
+        """Queue a first run of each periodic task that has no run waiting"""
+        for task in self.periodic:
+            pending = Job.query.filter(Job.task == task, Job.status.in_(('queued', 'running'))).first()
+            if pending is None:
+                self.enqueue(task, key=f'schedule:{task}')
+        db.session.commit()
+
+    def run_pending(self, worker_id=None):
+        """Run every job that is due now; returns how many ran"""
+        worker_id = worker_id or _worker_id()
+        count = 0
+        while self.run_one(worker_id):
+            count += 1
+        return count
+
+    def work(self, burst=False):
+        """Worker loop: run due jobs, poll when idle, stop cleanly on SIGTERM/SIGINT"""
+        worker_id = _worker_id()
+        stopping = []
+
+        def stop(signum, frame):
+            logger.info('Worker %s stopping after the current job', worker_id)
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        logger.info('Worker %s started (%s)', worker_id, ', '.join(sorted(self.tasks)))
+        self.ensure_scheduled()
+        while not stopping:
+            try:
+                ran = self.run_one(worker_id)
+            finally:
+                db.session.remove()
+            if not ran:
+                if burst:
+                    break
+                time.sleep(self.poll_interval)
+
+    def run_pending_after_response(self):
+        """JOBS_INLINE: run what the admin's request enqueued, and due periodic tasks, after its response"""
+        with self.app.app_context():
+            try:
+                # No worker starts up to queue the first periodic runs: do it here
+                self.ensure_scheduled()
+                self.run_pending()
+            finally:
+                db.session.remove()
+
+    # ---- content generation across hosts ----
+
+    def _sync_after_response(self, response):
+        """Check for finished content jobs once the response is sent, every CONTENT_SYNC_SECONDS"""
+        now = time.monotonic()
+        with self._sync_lock:
+            if self._synced_at is not None and now - self._synced_at < self.sync_seconds:
+                return response
+            self._synced_at = now
+        response.call_on_close(self.sync_generation)
+        return response
+
+    def sync_generation(self):
+        """Bump this host's content generation for content jobs finished since the last check"""
+        tasks = [name for name, task in self.tasks.items() if task.invalidates]
+        with self._sync_lock:
+            since = self._synced_up_to
+        with self.app.app_context():
+            try:
+                finished = dict(db.session.query(Job.task, func.max(Job.finished_at))
+                                .filter(Job.status == 'succeeded', Job.task.in_(tasks), Job.finished_at > since)
+                                .group_by(Job.task).all())
+            finally:
+                db.session.remove()
+        if not finished:
+            return
+        with self._sync_lock:
+            # The worker's clock from here on, so the hosts' clocks needn't agree
+            self._synced_up_to = max(self._synced_up_to, *finished.values())
+        logger.info('Content jobs finished elsewhere (%s): bumping the content generation', ', '.join(sorted(finished)))
+        self.generation.bump(*{model for name in finished for model in self.tasks[name].invalidates})
+
+    # ---- status ----
+
+    def counts(self):
+        """{status: number of jobs}"""
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+        return counts
+
+
+def _worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+job_queue = JobQueue()
@@ -0,0 +1,329 @@
+"""
+Per-request instrumentation exported in Prometheus text format.
+
+For every endpoint we record a request duration histogram, status counts,
+SQL statement count and time (SQLAlchemy engine events), template render
+time (Flask's template signals) and response bytes. Updates are a few
+additions under a lock, so this stays on in production. Routes decorated
+with @query_budget(n) are also checked against their SQL statement budget.
+
+Each worker keeps its own counters and writes them to
+instance/metrics/<pid>.json at most every METRICS_FLUSH_INTERVAL seconds.
+`render()` sums every worker's snapshot (its own live counters instead of
+its file), so a scrape of /admin/metrics on any worker covers them all.
+Snapshots left behind by exited workers are folded into retired.json so
+counters stay monotonic across worker restarts.
+"""
+import os
+import json
+import atexit
+import time
+import logging
+import threading
+from functools import wraps
+from flask import g, request, current_app, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNTERS = ('sql_queries', 'sql_seconds', 'template_seconds', 'response_bytes', 'budget_exceeded')
+RETIRED = 'retired.json'
+LOCK_STALE_SECONDS = 60
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(statements):
+    """Maximum SQL statements a GET of this route may run (cold cache included)
+
+    Checked on every request while metrics are enabled: an overrun is logged
+    and counted, and raises QueryBudgetExceeded when QUERY_BUDGET_STRICT is set
+    (the default in debug mode). Place it directly under @app.route.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            return f(*args, **kwargs)
+        decorated_function.query_budget = statements
+        return decorated_function
+    return decorator
+
+
+def _empty_endpoint():
+    return {
+        'count': 0,
+        'duration_sum': 0.0,
+        'buckets': [0] * len(DURATION_BUCKETS),
+        'status': {},
+        'sql_queries': 0,
+        'sql_seconds': 0.0,
+        'template_seconds': 0.0,
+        'response_bytes': 0,
+        'budget_exceeded': 0,
+    }
+
+
+def merge(into, snapshot):
+    """Add one snapshot ({endpoint: counters}) into another"""
+    for endpoint, counters in snapshot.items():
+        target = into.setdefault(endpoint, _empty_endpoint())
+        target['count'] += counters['count']
+        target['duration_sum'] += counters['duration_sum']
+        target['buckets'] = [a + b for a, b in zip(target['buckets'], counters['buckets'])]
+        for status, count in counters['status'].items():
+            target['status'][status] = target['status'].get(status, 0) + count
+        for name in COUNTERS:
+            target[name] += counters.get(name, 0)
+    return into
+
+
+def _pid_alive(pid):
+    if os.name == 'nt':
+        # os.kill(pid, 0) terminates the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def budget_for(endpoint):
+    """The @query_budget of an endpoint's view, or None"""
+    view = current_app.view_functions.get(endpoint)
+    return getattr(view, 'query_budget', None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    """Request, SQL and template metrics for one Flask app"""
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.flush_interval = 5
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._last_flush = 0.0
+
+    def init_app(self, app, db):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+        self.directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 5)
+        os.makedirs(self.directory, exist_ok=True)
+
+        app.before_request(self._before_request)
+        # after_request hooks run in reverse order of registration; registering
+        # early means this one runs last and sees the compressed body size
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        with app.app_context():
+            # Every bind, so reads routed to a replica are counted too
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        # Don't lose the requests since the last flush when a worker exits
+        atexit.register(self.flush)
+        app.extensions['metrics'] = self
+
+    # ---- per-request collection ----
+
+    def _before_request(self):
+        g._metrics = {'started': time.perf_counter(), 'sql_queries': 0, 'sql_seconds': 0.0,
+                      'template_seconds': 0.0, 'render_depth': 0, 'render_started': 0.0}
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and '_metrics' in g:
+            conn.info['metrics_query_started'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('metrics_query_started', None)
+        if started is not None and has_request_context() and '_metrics' in g:
+            g._metrics['sql_queries'] += 1
+            g._metrics['sql_seconds'] += time.perf_counter() - started
+
+    def _before_render(self, sender, **extra):
+        state = g.get('_metrics')
+        if state is None:
+            return
+        # Only time the outermost render; nested render_template calls are inside it
+        if state['render_depth'] == 0:
+            state['render_started'] = time.perf_counter()
+        state['render_depth'] += 1
+
+    def _after_render(self, sender, **extra):
+        state = g.get('_metrics')
+        if state is None or state['render_depth'] == 0:
+            return
+        state['render_depth'] -= 1
+        if state['render_depth'] == 0:
+            state['template_seconds'] += time.perf_counter() - state['render_started']
+
+    def _after_request(self, response):
+        state = g.pop('_metrics', None)
+        if state is None:
+            return response
+        duration = time.perf_counter() - state['started']
+        size = response.content_length
+        if size is None:
+            size = response.calculate_content_length() or 0
+        endpoint = request.endpoint or '<unmatched>'
+        over_budget = self._check_budget(endpoint, state['sql_queries'])
+        self.observe(endpoint, response.status_code, duration, state['sql_queries'], state['sql_seconds'],
+                     state['template_seconds'], size, over_budget)
+        strict = current_app.config.get('QUERY_BUDGET_STRICT')
+        if over_budget and (current_app.debug if strict is None else strict):
+            raise QueryBudgetExceeded(f'{endpoint} ran {state["sql_queries"]} SQL statements '
+                                      f'(budget {budget_for(endpoint)})')
+        return response
+
+    def _check_budget(self, endpoint, statements):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        budget = budget_for(endpoint)
+        if budget is None or statements <= budget:
+            return False
+        logger.warning('Query budget exceeded: %s %s ran %d SQL statements (budget %d)',
+                       request.method, request.path, statements, budget)
+        return True
+
+    def observe(self, endpoint, status, duration, sql_queries, sql_seconds, template_seconds, response_bytes,
+                over_budget=False):
+        with self._lock:
+            counters = self._endpoints.get(endpoint)
+            if counters is None:
+                counters = self._endpoints[endpoint] = _empty_endpoint()
+            counters['count'] += 1
+            counters['duration_sum'] += duration
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    counters['buckets'][i] += 1
+                    break
+            status = str(status)
+            counters['status'][status] = counters['status'].get(status, 0) + 1
+            counters['sql_queries'] += sql_queries
+            counters['sql_seconds'] += sql_seconds
+            counters['template_seconds'] += template_seconds
+            counters['response_bytes'] += response_bytes
+            counters['budget_exceeded'] += 1 if over_budget else 0
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    # ---- cross-worker aggregation ----
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._endpoints))
+
+    def flush(self):
+        """Write this worker's counters to its snapshot file"""
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.directory, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _retire_dead_workers(self, names):
+        """Fold snapshots of exited workers into retired.json; returns names still live"""
+        dead = [name for name in names if not _pid_alive(int(name[:-5]))]
+        if not dead:
+            return names
+        lock_path = os.path.join(self.directory, 'retire.lock')
+        try:
+            if time.time() - os.path.getmtime(lock_path) > LOCK_STALE_SECONDS:
+                os.remove(lock_path)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            # Another worker is retiring them right now; count them as they are
+            return names
+        try:
+            retired = self._read(RETIRED)
+            for name in dead:
+                merge(retired, self._read(name))
+            tmp_path = os.path.join(self.directory, f'{RETIRED}.{os.getpid()}.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(retired, f)
+            os.replace(tmp_path, os.path.join(self.directory, RETIRED))
+            for name in dead:
+                os.remove(os.path.join(self.directory, name))
+        finally:
+            os.remove(lock_path)
+        return [name for name in names if name not in dead]
+
+    def aggregate(self):
+        """Counters summed over every worker on this host"""
+        own = f'{os.getpid()}.json'
+        names = [name for name in os.listdir(self.directory)
+                 if name.endswith('.json') and name[:-5].isdigit() and name != own]
+        totals = {}
+        for name in self._retire_dead_workers(names):
+            merge(totals, self._read(name))
+        merge(totals, self._read(RETIRED))
+        return merge(totals, self.snapshot())
+
+    def render(self):
+        """Prometheus text exposition of the aggregated counters"""
+        totals = self.aggregate() if self.enabled else {}
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        family('http_requests_total', 'counter', 'Requests by endpoint and status code')
+        for endpoint, c in sorted(totals.items()):
+            for status, count in sorted(c['status'].items()):
+                lines.append(f'http_requests_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {count}')
+
+        family('http_request_duration_seconds', 'histogram', 'Request duration by endpoint')
+        for endpoint, c in sorted(totals.items()):
+            label = f'endpoint="{_escape(endpoint)}"'
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, c['buckets']):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{label},le="+Inf"}} {c["count"]}')
+            lines.append(f'http_request_duration_seconds_sum{{{label}}} {c["duration_sum"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{label}}} {c["count"]}')
+
+        for name, key, help_text in (
+                ('http_sql_queries_total', 'sql_queries', 'SQL statements executed while handling requests'),
+                ('http_sql_seconds_total', 'sql_seconds', 'Time spent executing SQL while handling requests'),
+                ('http_template_render_seconds_total', 'template_seconds', 'Time spent rendering templates'),
+                ('http_response_bytes_total', 'response_bytes', 'Response body bytes sent (after compression)'),
+                ('http_query_budget_exceeded_total', 'budget_exceeded', 'GETs that ran more SQL than their budget')):
+            family(name, 'counter', help_text)
+            for endpoint, c in sorted(totals.items()):
+                value = c.get(key, 0)
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'{name}{{endpoint="{_escape(endpoint)}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -1,9 +1,35 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import datetime, date
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import validates
 import enum
+import re
+from pagination import after
+from richtext import to_html
+from database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+PUBLICATION_DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y', '%d %B %Y', '%d %b %Y', '%B %d, %Y',
+                            '%b %d, %Y', '%B %d %Y', '%b %d %Y', '%Y-%m', '%B %Y', '%b %Y', '%Y')
+
+def parse_publication_date(value, fallback=None):
+    """Best-effort date from a free-text publication date ('2023-08-10', 'March 2023', ...)
+    
+    Partial dates resolve to the first day of the month or year; text with
+    no recognisable date falls back to the first four-digit year in it, then
+    to `fallback`.
+    """
+    text = (value or '').strip()
+    for fmt in PUBLICATION_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    year = re.search(r'\b(1[89]\d\d|2\d\d\d)\b', text)
+    if year:
+        return date(int(year.group(1)), 1, 1)
+    return fallback
 
 class ProjectCategory(enum.Enum):
     MEDICINE = "medicine"
@@ -18,12 +44,50 @@ class Project(db.Model):
     slug = db.Column(db.String(200), unique=True, nullable=False)
     preview_summary = db.Column(db.Text, nullable=False)
     preview_image_path = db.Column(db.String(500), nullable=False)
+    preview_variants = db.Column(db.Text, nullable=True)  # JSON list of resized copies
     page_intro_text = db.Column(db.Text, nullable=True)
+    page_intro_html = db.Column(db.Text, nullable=True)  # Rendered from page_intro_text on save
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationship to images
-    images = db.relationship('ProjectImage', backref='project', lazy=True, cascade='all, delete-orphan')
+    # Relationship to images, in gallery order. Lazy by default: pages that
+    # show galleries load them with selectinload(Project.images) (one query).
+    # Ordering by project_id first lets that query read the index in order
+    images = db.relationship('ProjectImage', backref='project', lazy=True, cascade='all, delete-orphan',
+                             order_by=lambda: (ProjectImage.project_id, ProjectImage.display_order))
+    
+    __table_args__ = (
+        db.Index('ix_projects_category_created_at', 'category', 'created_at'),
+        db.Index('ix_projects_created_at_id', 'created_at', 'id'),  # archive keyset order
+        db.Index('ix_projects_updated_at', 'updated_at'),  # Last-Modified / freeze stamps
+    )
+    
+    @staticmethod
+    def archive_key():
+        """Archive sort key (newest first); id breaks ties so the order is total"""
+        return (Project.created_at, Project.id)
+    
+    @staticmethod
+    def archive_order():
+        """Newest first, with id as a tie-breaker so the order is total"""
+        return tuple(column.desc() for column in Project.archive_key())
+    
+    def next_in_archive(self):
+        """Next project in archive order, wrapping around to the newest
+        
+        Keyset lookup: fetches only the successor row instead of loading and
+        scanning the whole archive.
+        """
+        older = after(Project.archive_key(), (self.created_at, self.id))
+        successor = Project.query.filter(older).order_by(*Project.archive_order()).first()
+        if successor is None:
+            successor = Project.query.order_by(*Project.archive_order()).first()
+        return successor
+    
+    @validates('page_intro_text')
+    def _render_page_intro(self, key, value):
+        self.page_intro_html = to_html(value)
+        return value
     
     def __repr__(self):
         return f'<Project {self.title}>'
@@ -34,9 +98,14 @@ class ProjectImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
     image_path = db.Column(db.String(500), nullable=False)
+    variants = db.Column(db.Text, nullable=True)  # JSON list of resized copies
     display_order = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_project_images_project_id_display_order', 'project_id', 'display_order'),
+    )
+    
     def __repr__(self):
         return f'<ProjectImage {self.image_path}>'
 
@@ -46,12 +115,29 @@ class Publication(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(500), nullable=False)
     journal = db.Column(db.String(300), nullable=False)
-    publication_date = db.Column(db.String(100), nullable=False)  # String for flexibility
+    publication_date = db.Column(db.String(100), nullable=False)  # As entered, for display
+    published_on = db.Column(db.Date, nullable=False)  # Parsed from publication_date, for sorting
     authors = db.Column(db.Text, nullable=False)
     url = db.Column(db.String(1000), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_publications_published_on_id', 'published_on', 'id'),
+        db.Index('ix_publications_updated_at', 'updated_at'),
+    )
+    
+    @staticmethod
+    def list_key():
+        """Sort key for publication lists (newest first)"""
+        return (Publication.published_on, Publication.id)
+    
+    @validates('publication_date')
+    def _parse_publication_date(self, key, value):
+        """Keep published_on in step with the display string"""
+        self.published_on = parse_publication_date(value, fallback=(self.created_at or datetime.utcnow()).date())
+        return value
+    
     def __repr__(self):
         return f'<Publication {self.title}>'
 
@@ -61,19 +147,51 @@ class Experience(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
+    description_html = db.Column(db.Text, nullable=True)  # Rendered from description on save
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_experiences_created_at_id', 'created_at', 'id'),
+        db.Index('ix_experiences_updated_at', 'updated_at'),
+    )
+    
+    @validates('description')
+    def _render_description(self, key, value):
+        self.description_html = to_html(value)
+        return value
+    
     def __repr__(self):
         return f'<Experience {self.title}>'
 
+DEFAULT_ABOUT_CONTENT = """I am a medical student with a deep passion for leveraging technology to solve complex problems in healthcare. 
+My journey combines rigorous medical training with expertise in machine learning, computer vision, and full-stack 
+web development.
+
+Through my research and projects, I've developed automated systems for medical image analysis, built predictive 
+models for patient outcomes, and created web applications that make healthcare data more accessible. I believe in 
+the power of interdisciplinary collaboration to drive innovation in medicine.
+
+When I'm not studying or coding, I enjoy exploring new technologies, contributing to open-source projects, and 
+sharing knowledge with the medical and tech communities. My goal is to bridge the gap between clinical practice 
+and cutting-edge technology to improve patient care."""
+
+# Shown on /about until the admin saves the page
+DEFAULT_ABOUT_HTML = to_html(DEFAULT_ABOUT_CONTENT)
+
 class AboutPage(db.Model):
     __tablename__ = 'about_page'
     
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
+    content_html = db.Column(db.Text, nullable=True)  # Rendered from content on save
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @validates('content')
+    def _render_content(self, key, value):
+        self.content_html = to_html(value)
+        return value
+    
     def __repr__(self):
         return f'<AboutPage {self.id}>'
 
@@ -88,3 +206,38 @@ class CV(db.Model):
     def __repr__(self):
         return f'<CV {self.download_name}>'
 
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not before
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),  # next due job
+        db.Index('ix_jobs_created_at_id', 'created_at', 'id'),  # dashboard list
+    )
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.task} {self.status}>'
+
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, unique=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
@@ -0,0 +1,75 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are ordered newest first on a key of columns ending in the primary
+key, e.g. (Project.created_at, Project.id). A cursor encodes the key of the
+last row shown, and the next page is "rows strictly after that key", so
+every page costs one indexed range scan however deep it is - unlike
+OFFSET, which reads and discards all earlier rows.
+
+Cursors are URL-safe base64 of the key as JSON; they are deterministic, so
+paginated URLs are stable enough to cache and to export statically.
+"""
+import json
+import base64
+from collections import namedtuple
+from datetime import datetime, date
+from sqlalchemy import and_, or_
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def encode_cursor(values):
+    """Cursor string for a row key (dates and datetimes as ISO strings)"""
+    plain = [value.isoformat() if isinstance(value, date) else value for value in values]
+    raw = json.dumps(plain, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Row key from a cursor; ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError(f'Invalid cursor: {cursor!r}')
+    key = []
+    for column, value in zip(columns, values):
+        # Well-formed JSON of the wrong types must not reach the query
+        python_type = column.type.python_type
+        if python_type in (datetime, date):
+            if not isinstance(value, str):
+                raise ValueError(f'Invalid cursor: {cursor!r}')
+            value = python_type.fromisoformat(value)
+        elif not isinstance(value, python_type) or isinstance(value, bool):
+            raise ValueError(f'Invalid cursor: {cursor!r}')
+        key.append(value)
+    return key
+
+
+def cursor_for(row, columns):
+    return encode_cursor([getattr(row, column.key) for column in columns])
+
+
+def after(columns, values):
+    """Condition selecting rows that come after `values` in descending key order"""
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column < value
+    return or_(column < value, and_(column == value, after(columns[1:], values[1:])))
+
+
+def keyset_page(query, columns, cursor=None, per_page=20):
+    """One page of `query` in descending key order, starting after `cursor`
+
+    Raises ValueError for a malformed cursor.
+    """
+    if cursor:
+        query = query.filter(after(columns, decode_cursor(cursor, columns)))
+    rows = query.order_by(*[column.desc() for column in columns]).limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = cursor_for(items[-1], columns) if len(rows) > per_page else None
+    return Page(items, next_cursor)
+
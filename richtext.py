@@ -0,0 +1,86 @@
+"""
+Render-at-write rich text.
+
+Admin-entered text (about page, project intros, experience descriptions) is
+converted to HTML once, when it is saved, and stored next to the source in
+an *_html column; public pages only output the stored HTML.
+
+Everything is HTML-escaped first, so the only markup in the result is what
+this module emits. On top of plain paragraphs it understands a small
+Markdown subset:
+
+- blank lines separate paragraphs; single newlines become <br>
+- lines starting with "- " or "* " form a bulleted list, "1. " a numbered one
+- **bold**, *italic* or _italic_, `code`
+- [text](url) links to http(s), mailto or site-relative URLs
+"""
+import re
+from markupsafe import escape
+
+_BULLET = re.compile(r'^[-*]\s+')
+_NUMBERED = re.compile(r'^\d+[.)]\s+')
+_CODE = re.compile(r'`([^`\n]+)`')
+_LINK = re.compile(r'\[([^\]\n]+)\]\(([^)\s]+)\)')
+_BOLD = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*')
+_ITALIC = re.compile(r'(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)')
+_SAFE_URL = re.compile(r'^(https?://|mailto:|/(?!/)|#)', re.IGNORECASE)
+
+
+_PLACEHOLDER = re.compile(r'\x00(\d+)\x00')
+
+
+def _bold_italic(text):
+    text = _BOLD.sub(r'<strong>\1</strong>', text)
+    return _ITALIC.sub(lambda m: f'<em>{m.group(1) or m.group(2)}</em>', text)
+
+
+def _link(label, url):
+    external = url.lower().startswith(('http://', 'https://'))
+    attrs = ' target="_blank" rel="noopener noreferrer"' if external else ''
+    return f'<a href="{url}"{attrs}>{_bold_italic(label)}</a>'
+
+
+def _emphasis(text):
+    """Links, bold and italic; emphasis never reaches into a link's URL"""
+    links = []
+
+    def placeholder(match):
+        if not _SAFE_URL.match(match.group(2)):
+            return match.group(0)
+        links.append(_link(match.group(1), match.group(2)))
+        return f'\x00{len(links) - 1}\x00'
+    # Links are set aside while emphasis runs, so _x_ or *x* in a URL stays put
+    text = _LINK.sub(placeholder, text.replace('\x00', ''))
+    return _PLACEHOLDER.sub(lambda m: links[int(m.group(1))], _bold_italic(text))
+
+
+def _inline(line):
+    """Inline markup for one escaped line; code spans are left literal"""
+    parts = _CODE.split(line)
+    # split() alternates text and code span contents
+    return ''.join(_emphasis(part) if i % 2 == 0 else f'<code>{part}</code>'
+                   for i, part in enumerate(parts))
+
+
+def _list(lines, marker, tag):
+    items = ''.join(f'<li>{_inline(marker.sub("", line, count=1))}</li>' for line in lines)
+    return f'<{tag}>{items}</{tag}>'
+
+
+def to_html(text):
+    """HTML for admin-entered text (None for None)"""
+    if text is None:
+        return None
+    text = str(escape(text.replace('\r\n', '\n').replace('\r', '\n')))
+    blocks = []
+    for block in re.split(r'\n\s*\n', text):
+        lines = [line.strip() for line in block.strip().split('\n')]
+        if not lines[0]:
+            continue
+        if all(_BULLET.match(line) for line in lines):
+            blocks.append(_list(lines, _BULLET, 'ul'))
+        elif all(_NUMBERED.match(line) for line in lines):
+            blocks.append(_list(lines, _NUMBERED, 'ol'))
+        else:
+            blocks.append('<p>' + '<br>'.join(_inline(line) for line in lines) + '</p>')
+    return '\n'.join(blocks)
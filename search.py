@@ -0,0 +1,209 @@
+"""
+Full-text search over projects, publications and experiences.
+
+One inverted index holds a document per searchable row:
+
+- SQLite: an FTS5 virtual table (porter stemming, prefix indexes), ranked
+  with bm25() and excerpted with snippet()
+- PostgreSQL: a table with a weighted tsvector column and a GIN index,
+  ranked with ts_rank_cd() and excerpted with ts_headline()
+
+Each document's key is derived from the row (id * 4 + kind code), so the
+admin handlers update or delete exactly one document in the same
+transaction as the row itself - no rebuilds. `rebuild()` exists for
+backfills (first run, `flask search-reindex`).
+"""
+import re
+import logging
+from collections import namedtuple
+from markupsafe import Markup, escape
+from sqlalchemy import text
+from sqlalchemy.orm import Session, load_only
+from models import db, Project, Publication, Experience
+
+logger = logging.getLogger(__name__)
+
+KINDS = {'project': 1, 'publication': 2, 'experience': 3}
+MAX_TERMS = 10
+# Snippet delimiters, swapped for <mark> after HTML-escaping the excerpt
+MARK_START, MARK_END = '\x02', '\x03'
+
+SearchResult = namedtuple('SearchResult', ['kind', 'id', 'ref', 'title', 'snippet', 'rank'])
+
+
+def _document(obj):
+    """(kind, ref, title, body) for a searchable model instance"""
+    if isinstance(obj, Project):
+        return 'project', obj.slug, obj.title, '\n'.join(filter(None, [obj.preview_summary, obj.page_intro_text]))
+    if isinstance(obj, Publication):
+        return 'publication', obj.url, obj.title, '\n'.join([obj.authors, obj.journal])
+    if isinstance(obj, Experience):
+        return 'experience', '', obj.title, obj.description
+    raise TypeError(f'{type(obj).__name__} is not searchable')
+
+
+# Columns _document() reads; rebuild() loads only these, so it also works
+# from a migration that runs before later columns exist
+_SOURCE_COLUMNS = {
+    Project: (Project.slug, Project.title, Project.preview_summary, Project.page_intro_text),
+    Publication: (Publication.url, Publication.title, Publication.authors, Publication.journal),
+    Experience: (Experience.title, Experience.description),
+}
+
+
+def _doc_id(kind, row_id):
+    return row_id * 4 + KINDS[kind]
+
+
+def terms(query):
+    """Words of a search query; punctuation and operators are dropped"""
+    return re.findall(r'\w+', query or '', re.UNICODE)[:MAX_TERMS]
+
+
+def highlight(snippet):
+    """Escaped snippet with matches wrapped in <mark>"""
+    return Markup(str(escape(snippet)).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+class _SQLiteBackend:
+    def create(self, connection):
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "kind UNINDEXED, ref UNINDEXED, title, body, "
+            "tokenize = 'porter unicode61', prefix = '2 3')"))
+
+    def upsert(self, connection, doc_id, kind, ref, title, body):
+        connection.execute(text('DELETE FROM search_index WHERE rowid = :doc_id'), {'doc_id': doc_id})
+        connection.execute(text(
+            'INSERT INTO search_index (rowid, kind, ref, title, body) '
+            'VALUES (:doc_id, :kind, :ref, :title, :body)'),
+            {'doc_id': doc_id, 'kind': kind, 'ref': ref, 'title': title, 'body': body})
+
+    def delete(self, connection, doc_id):
+        connection.execute(text('DELETE FROM search_index WHERE rowid = :doc_id'), {'doc_id': doc_id})
+
+    def clear(self, connection):
+        connection.execute(text('DELETE FROM search_index'))
+
+    def search(self, connection, words, kind, limit):
+        # Each word is quoted (no FTS operators get through) and prefix-matched
+        match = ' '.join('"{}"*'.format(word.replace('"', '')) for word in words)
+        sql = ("SELECT rowid, kind, ref, title, "
+               "snippet(search_index, 3, :start, :end, '…', 16) AS snippet, "
+               "bm25(search_index, 0, 0, 5.0, 1.0) AS rank "
+               "FROM search_index WHERE search_index MATCH :match")
+        params = {'match': match, 'start': MARK_START, 'end': MARK_END, 'limit': limit}
+        if kind:
+            sql += ' AND kind = :kind'
+            params['kind'] = kind
+        rows = connection.execute(text(sql + ' ORDER BY rank LIMIT :limit'), params)
+        # bm25 is lower-is-better; report higher-is-better like PostgreSQL
+        return [(rowid, kind, ref, title, snippet, -rank) for rowid, kind, ref, title, snippet, rank in rows]
+
+
+class _PostgresBackend:
+    def create(self, connection):
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS search_index ('
+            'doc_id BIGINT PRIMARY KEY, kind VARCHAR(20) NOT NULL, ref TEXT NOT NULL, '
+            'title TEXT NOT NULL, body TEXT NOT NULL, document TSVECTOR NOT NULL)'))
+        connection.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_search_index_document ON search_index USING GIN (document)'))
+
+    def upsert(self, connection, doc_id, kind, ref, title, body):
+        connection.execute(text(
+            "INSERT INTO search_index (doc_id, kind, ref, title, body, document) "
+            "VALUES (:doc_id, :kind, :ref, :title, :body, "
+            "setweight(to_tsvector('english', :title), 'A') || setweight(to_tsvector('english', :body), 'B')) "
+            "ON CONFLICT (doc_id) DO UPDATE SET kind = EXCLUDED.kind, ref = EXCLUDED.ref, "
+            "title = EXCLUDED.title, body = EXCLUDED.body, document = EXCLUDED.document"),
+            {'doc_id': doc_id, 'kind': kind, 'ref': ref, 'title': title, 'body': body})
+
+    def delete(self, connection, doc_id):
+        connection.execute(text('DELETE FROM search_index WHERE doc_id = :doc_id'), {'doc_id': doc_id})
+
+    def clear(self, connection):
+        connection.execute(text('DELETE FROM search_index'))
+
+    def search(self, connection, words, kind, limit):
+        # \w-only words joined with & are always a valid tsquery
+        query = ' & '.join(f'{word}:*' for word in words)
+        sql = ("SELECT doc_id, kind, ref, title, "
+               "ts_headline('english', body, q, :options) AS snippet, "
+               "ts_rank_cd(document, q) AS rank "
+               "FROM search_index, to_tsquery('english', :query) AS q WHERE document @@ q")
+        params = {'query': query, 'limit': limit,
+                  'options': f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10'}
+        if kind:
+            sql += ' AND kind = :kind'
+            params['kind'] = kind
+        return list(connection.execute(text(sql + ' ORDER BY rank DESC LIMIT :limit'), params))
+
+
+_BACKENDS = {'sqlite': _SQLiteBackend, 'postgresql': _PostgresBackend}
+
+
+class SearchIndex:
+    """Dialect-specific full-text index, updated row by row from the admin handlers"""
+
+    def _backend(self, connection):
+        backend = _BACKENDS.get(connection.dialect.name)
+        return backend() if backend else None
+
+    def create(self, connection):
+        """Create the index structures if they don't exist (idempotent)"""
+        backend = self._backend(connection)
+        if backend is None:
+            logger.warning('Full-text search is not supported on %s', connection.dialect.name)
+            return
+        backend.create(connection)
+
+    def index(self, obj):
+        """Add or refresh one row's document; call before committing the row"""
+        db.session.flush()  # new rows need their id
+        connection = db.session.connection()
+        backend = self._backend(connection)
+        if backend is None:
+            return
+        kind, ref, title, body = _document(obj)
+        backend.upsert(connection, _doc_id(kind, obj.id), kind, ref, title, body)
+
+    def remove(self, obj):
+        """Drop one row's document; call before committing the delete"""
+        connection = db.session.connection()
+        backend = self._backend(connection)
+        if backend is not None:
+            backend.delete(connection, _doc_id(_document(obj)[0], obj.id))
+
+    def rebuild(self, connection):
+        """Re-index every row (backfills only; saves use index()/remove())"""
+        backend = self._backend(connection)
+        if backend is None:
+            return 0
+        backend.clear(connection)
+        count = 0
+        # Read through the same connection: on SQLite a second one would
+        # hold a read lock against this transaction
+        with Session(bind=connection) as session:
+            for model, columns in _SOURCE_COLUMNS.items():
+                for obj in session.scalars(db.select(model).options(load_only(*columns))):
+                    kind, ref, title, body = _document(obj)
+                    backend.upsert(connection, _doc_id(kind, obj.id), kind, ref, title, body)
+                    count += 1
+        return count
+
+    def search(self, query, kind=None, limit=20):
+        """Ranked results (best first) for a free-text query, matching word prefixes"""
+        words = terms(query)
+        if not words:
+            return []
+        connection = db.session.connection()
+        backend = self._backend(connection)
+        if backend is None:
+            return []
+        rows = backend.search(connection, words, kind if kind in KINDS else None, limit)
+        return [SearchResult(kind, doc_id // 4, ref, title, highlight(snippet), rank)
+                for doc_id, kind, ref, title, snippet, rank in rows]
+
+
+search_index = SearchIndex()
@@ -0,0 +1,57 @@
+// Projects Archive: load the next page of cards as the visitor scrolls.
+// Without JavaScript the "Load more" link opens the next page instead.
+document.addEventListener('DOMContentLoaded', function() {
+    const grid = document.querySelector('.projects-grid');
+    const loadMore = document.querySelector('.archive-load-more');
+    if (!grid || !loadMore || !window.fetch) return;
+    
+    let loading = false;
+    let observer = null;
+    
+    function nearViewport() {
+        return loadMore.getBoundingClientRect().top < window.innerHeight + 600;
+    }
+    
+    function loadNextPage() {
+        const url = loadMore.dataset.cards;
+        if (loading || !url) return;
+        loading = true;
+        
+        fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(response => {
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                return response.json();
+            })
+            .then(data => {
+                grid.insertAdjacentHTML('beforeend', data.html);
+                if (data.next) {
+                    loadMore.dataset.cards = data.next;
+                    loadMore.href = data.next_page;
+                } else {
+                    if (observer) observer.disconnect();
+                    loadMore.parentElement.remove();
+                }
+            })
+            .catch(() => {
+                // Fall back to a full page load of the next page
+                window.location.href = loadMore.href;
+            })
+            .finally(() => {
+                loading = false;
+                // Tall screens may still show the end of the grid: keep going
+                if (loadMore.isConnected && nearViewport()) loadNextPage();
+            });
+    }
+    
+    loadMore.addEventListener('click', function(e) {
+        e.preventDefault();
+        loadNextPage();
+    });
+    
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) loadNextPage();
+        }, { rootMargin: '0px 0px 600px 0px' });
+        observer.observe(loadMore);
+    }
+});
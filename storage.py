@@ -0,0 +1,300 @@
+"""
+Pluggable storage for uploaded files.
+
+Everything that reads or writes uploads (the upload handlers, image
+variants, the sweeper, `download_cv()` and the `asset_url` filter) goes
+through `storage`, addressing files by the path stored in the database
+(uploads/cas/ab/<digest>.png, uploads/variants/...). STORAGE_BACKEND picks
+the backend:
+
+- 'local' (default): files under static/ on the web server's disk, served
+  by the app's upload routes.
+- 's3': objects in an S3-compatible bucket (AWS S3, MinIO, Cloudflare R2,
+  a local emulator via S3_ENDPOINT_URL), so every app instance sees the
+  same files. Requires `pip install boto3`; credentials come from the
+  usual AWS environment variables. Uploads stream to the bucket through
+  boto3's managed transfer (multipart above S3_MULTIPART_THRESHOLD_MB).
+  Pages link to S3_PUBLIC_URL (a public bucket or CDN) when it is set;
+  otherwise the upload routes redirect to short-lived presigned URLs.
+
+`flask uploads migrate-storage` copies an existing static/uploads into the
+configured backend.
+"""
+import os
+import uuid
+import shutil
+import tempfile
+import mimetypes
+from collections import namedtuple
+from contextlib import contextmanager
+from urllib.parse import quote
+from werkzeug.security import safe_join
+
+StoredFile = namedtuple('StoredFile', ['path', 'size', 'modified'])
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _copy_hashing(source, target, hasher):
+    """Copy a binary stream, feeding every chunk to a hashlib object too"""
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+        hasher.update(chunk)
+        target.write(chunk)
+
+
+class LocalStorage:
+    """Files under a directory on local disk (static/)"""
+
+    remote = False
+
+    def __init__(self, root):
+        self.root = root
+
+    def local_file(self, path):
+        """Filesystem location of a stored path; ValueError for paths escaping the root"""
+        file_path = safe_join(self.root, path)
+        if file_path is None:
+            raise ValueError(f'Invalid storage path {path!r}')
+        return file_path
+
+    def stat(self, path):
+        """StoredFile for path, or None if it doesn't exist"""
+        try:
+            stat = os.stat(self.local_file(path))
+        except (OSError, ValueError):
+            return None
+        return StoredFile(path, stat.st_size, stat.st_mtime)
+
+    def exists(self, path):
+        return self.stat(path) is not None
+
+    def save(self, path, stream, content_type=None):
+        """Write a binary stream to path, replacing it atomically"""
+        destination = self.local_file(path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        # Write to a temporary name so a half-written file is never visible
+        tmp_destination = f"{destination}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_destination, 'wb') as f:
+                shutil.copyfileobj(stream, f)
+            os.replace(tmp_destination, destination)
+        except OSError:
+            if os.path.exists(tmp_destination):
+                os.remove(tmp_destination)
+            raise
+
+    def save_hashed(self, stream, directory, path_for, hasher, content_type=None):
+        """Store a stream at path_for(hasher's hex digest), reading it once; returns (path, created)
+
+        The stream is hashed while it is written to a temporary file in
+        `directory`, which is renamed to the digest's path, or dropped (and
+        the stored file touched) if that content is already stored.
+        """
+        staging = self.local_file(directory)
+        os.makedirs(staging, exist_ok=True)
+        tmp_file = os.path.join(staging, f'.{uuid.uuid4().hex}.tmp')
+        try:
+            with open(tmp_file, 'wb') as f:
+                _copy_hashing(stream, f, hasher)
+            path = path_for(hasher.hexdigest())
+            destination = self.local_file(path)
+            if os.path.exists(destination):
+                os.remove(tmp_file)
+                self.touch(path)
+                return path, False
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            os.replace(tmp_file, destination)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        return path, True
+
+    def touch(self, path):
+        """Move a file's modification time to now"""
+        os.utime(self.local_file(path))
+
+    def delete(self, path):
+        """Remove path (if present) and any directories that leaves empty"""
+        file_path = self.local_file(path)
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            return
+        # Drop emptied shard directories (uploads/cas/ab/), never the top one
+        directory, top = os.path.dirname(file_path), self.local_file(path.split('/', 1)[0])
+        while directory != top and directory.startswith(top):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break  # Not empty
+            directory = os.path.dirname(directory)
+
+    def list(self, prefix):
+        """StoredFile for every file whose path starts with prefix"""
+        base = self.local_file(prefix.rsplit('/', 1)[0]) if '/' in prefix else self.root
+        for directory, _, names in os.walk(base):
+            for name in names:
+                file_path = os.path.join(directory, name)
+                path = os.path.relpath(file_path, self.root).replace(os.sep, '/')
+                if not path.startswith(prefix):
+                    continue
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue  # Removed meanwhile
+                yield StoredFile(path, stat.st_size, stat.st_mtime)
+
+    @contextmanager
+    def local_copy(self, path):
+        """Filesystem path with path's content, for libraries that need one"""
+        yield self.local_file(path)
+
+    def public_url(self, path):
+        """Permanent URL pages can link to directly; None means the app serves path"""
+        return None
+
+    def url(self, path, download_name=None):
+        """URL to redirect a request for path to; None means the app serves it itself"""
+        return None
+
+
+class S3Storage:
+    """Objects in an S3-compatible bucket, under an optional key prefix"""
+
+    remote = True
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, public_url=None,
+                 url_expiry=3600, multipart_threshold=8 * 1024 * 1024):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND 's3' requires boto3 (pip install boto3)")
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND 's3' requires S3_BUCKET")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.public_base = public_url.rstrip('/') if public_url else None
+        self.url_expiry = url_expiry
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None, region_name=region or None)
+        self.transfer_config = TransferConfig(multipart_threshold=multipart_threshold,
+                                              multipart_chunksize=multipart_threshold)
+        self._client_error = ClientError
+
+    def key(self, path):
+        return self.prefix + path
+
+    def _missing(self, error):
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def stat(self, path):
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.key(path))
+        except self._client_error as e:
+            if self._missing(e):
+                return None
+            raise
+        return StoredFile(path, head['ContentLength'], head['LastModified'].timestamp())
+
+    def exists(self, path):
+        return self.stat(path) is not None
+
+    def save(self, path, stream, content_type=None):
+        """Stream to the bucket; large files go up as a multipart upload"""
+        content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        extra = {'ContentType': content_type}
+        if path.startswith('uploads/cas/'):
+            # Content-addressed: the object under this key never changes
+            extra['CacheControl'] = 'public, max-age=31536000, immutable'
+        self.client.upload_fileobj(stream, self.bucket, self.key(path),
+                                   ExtraArgs=extra, Config=self.transfer_config)
+
+    def save_hashed(self, stream, directory, path_for, hasher, content_type=None):
+        """Spool to a local temporary file while hashing, then upload it unless that content is stored
+
+        `directory` only matters for local storage. Returns (path, created).
+        """
+        with tempfile.TemporaryFile() as f:
+            _copy_hashing(stream, f, hasher)
+            path = path_for(hasher.hexdigest())
+            if self.exists(path):
+                self.touch(path)
+                return path, False
+            f.seek(0)
+            self.save(path, f, content_type=content_type)
+        return path, True
+
+    def touch(self, path):
+        """Move an object's LastModified to now (copy onto itself)"""
+        key = self.key(path)
+        head = self.client.head_object(Bucket=self.bucket, Key=key)
+        # REPLACE (required to copy an object onto itself) resets headers not passed again
+        headers = {name: head[name] for name in ('CacheControl', 'ContentDisposition') if name in head}
+        self.client.copy_object(Bucket=self.bucket, Key=key, CopySource={'Bucket': self.bucket, 'Key': key},
+                                MetadataDirective='REPLACE', Metadata=head.get('Metadata', {}),
+                                ContentType=head.get('ContentType', 'binary/octet-stream'), **headers)
+
+    def delete(self, path):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(path))
+
+    def list(self, prefix):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.key(prefix)):
+            for item in page.get('Contents', []):
+                yield StoredFile(item['Key'][len(self.prefix):], item['Size'], item['LastModified'].timestamp())
+
+    @contextmanager
+    def local_copy(self, path):
+        """Download to a temporary file for the duration of the block"""
+        suffix = os.path.splitext(path)[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix) as f:
+            self.client.download_fileobj(self.bucket, self.key(path), f)
+            f.flush()
+            yield f.name
+
+    def public_url(self, path):
+        """Object URL under S3_PUBLIC_URL, if set (presigned URLs expire, so pages can't embed them)"""
+        if self.public_base:
+            return f'{self.public_base}/{quote(self.key(path))}'
+        return None
+
+    def url(self, path, download_name=None):
+        """Public or presigned URL; downloads are always presigned so the file gets its name"""
+        if self.public_base and not download_name:
+            return self.public_url(path)
+        params = {'Bucket': self.bucket, 'Key': self.key(path)}
+        if download_name:
+            params['ResponseContentDisposition'] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.url_expiry)
+
+
+class Storage:
+    """The configured backend; attribute access is forwarded to it"""
+
+    def __init__(self):
+        self.backend = LocalStorage('static')
+
+    def init_app(self, app):
+        self.backend = create_backend(app.config)
+        app.extensions['storage'] = self
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+def create_backend(config):
+    """Backend for a config mapping (STORAGE_BACKEND and S3_* keys)"""
+    name = config.get('STORAGE_BACKEND', 'local')
+    if name == 'local':
+        return LocalStorage(os.path.dirname(config.get('UPLOAD_FOLDER', 'static/uploads').rstrip('/')))
+    if name == 's3':
+        return S3Storage(config.get('S3_BUCKET'), prefix=config.get('S3_PREFIX', ''),
+                         endpoint_url=config.get('S3_ENDPOINT_URL'), region=config.get('S3_REGION'),
+                         public_url=config.get('S3_PUBLIC_URL'), url_expiry=config.get('S3_URL_EXPIRY', 3600),
+                         multipart_threshold=int(config.get('S3_MULTIPART_THRESHOLD_MB', 8) * 1024 * 1024))
+    raise ValueError(f"Unknown STORAGE_BACKEND '{name}'; available: local, s3")
+
+
+storage = Storage()
@@ -0,0 +1,130 @@
+"""
+Orphaned upload garbage collection and storage usage.
+
+Saves and deletes already release the files they stop using (see
+uploads.release), but files still leak: uploads from before reference
+counting, predecessors of re-uploaded previews, variants of deleted
+originals, temporary files from interrupted writes. `sweep()` diffs the
+uploads in storage (local disk or bucket) against every path the database references (Project,
+ProjectImage, CV and their image variants) and removes the rest.
+
+Files modified within the grace period are never touched: an upload is
+written before the row pointing at it commits, and variants are written
+before their job records them.
+
+Orphans are attributed to a project where the file name says which one:
+uploads stored before content addressing were named
+<slug>-preview-... / <slug>-gallery-N-..., so the report can show bytes
+reclaimable per project. Content-addressed blobs carry no such name.
+"""
+import os
+import re
+import json
+import time
+import logging
+from collections import namedtuple
+from models import db, Project, ProjectImage, CV
+from images import VARIANT_DIR, variant_stem
+from storage import storage
+
+logger = logging.getLogger(__name__)
+
+UNATTRIBUTED = '(deleted or replaced uploads)'
+_VARIANT_NAME = re.compile(r'^(?P<stem>.+)-\d+w\.\w+$')
+_LEGACY_NAME = re.compile(r'^(?P<slug>.+?)-(?:preview|gallery-\d+)-\d{14}-')
+
+Orphan = namedtuple('Orphan', ['path', 'size', 'modified', 'project'])
+SweepReport = namedtuple('SweepReport', ['orphans', 'kept_recent', 'deleted', 'dry_run'])
+
+
+def referenced():
+    """(stored paths, variant stems) the database refers to"""
+    paths, stems = set(), set()
+    rows = (db.session.query(Project.preview_image_path, Project.preview_variants).all()
+            + db.session.query(ProjectImage.image_path, ProjectImage.variants).all()
+            + [(path, None) for (path,) in db.session.query(CV.file_path).all()])
+    for path, variants in rows:
+        paths.add(path)
+        # Every variant of a referenced original is kept, recorded or not
+        stems.add(variant_stem(path))
+        for variant in json.loads(variants) if variants else []:
+            paths.add(variant['path'])
+    return paths, stems
+
+
+def _project_for(name, slugs):
+    match = _LEGACY_NAME.match(name)
+    if match and match.group('slug') in slugs:
+        return match.group('slug')
+    return UNATTRIBUTED
+
+
+def find_orphans(grace_seconds, now=None):
+    """(orphans, number of unreferenced files kept for being newer than the grace period)"""
+    now = now or time.time()
+    paths, stems = referenced()
+    slugs = {slug for (slug,) in db.session.query(Project.slug).all()}
+    orphans, kept_recent = [], 0
+    for stored in storage.list('uploads/'):
+        path = stored.path
+        if path in paths:
+            continue
+        name = os.path.basename(path)
+        if path.startswith(VARIANT_DIR + '/'):
+            match = _VARIANT_NAME.match(name)
+            if match and match.group('stem') in stems:
+                continue
+            # Attribute a variant by its original's name
+            name = match.group('stem')[len('uploads-'):] if match else name
+        if now - stored.modified < grace_seconds:
+            kept_recent += 1
+            continue
+        orphans.append(Orphan(path, stored.size, stored.modified, _project_for(name, slugs)))
+    return orphans, kept_recent
+
+
+def sweep(grace_seconds, dry_run=False):
+    """Delete (or with dry_run, only report) orphaned files; returns a SweepReport"""
+    orphans, kept_recent = find_orphans(grace_seconds)
+    deleted = []
+    if not dry_run:
+        for orphan in orphans:
+            try:
+                storage.delete(orphan.path)
+            except Exception as e:
+                logger.warning('Could not delete %s: %s', orphan.path, e)
+                continue
+            deleted.append(orphan)
+        logger.info('Swept %d orphaned uploads (%d bytes)', len(deleted), sum(o.size for o in deleted))
+    return SweepReport(orphans, kept_recent, deleted, dry_run)
+
+
+def by_project(orphans):
+    """[(project, files, bytes)], largest first"""
+    totals = {}
+    for orphan in orphans:
+        files, size = totals.get(orphan.project, (0, 0))
+        totals[orphan.project] = (files + 1, size + orphan.size)
+    return sorted(((project, files, size) for project, (files, size) in totals.items()),
+                  key=lambda row: row[2], reverse=True)
+
+
+_usage = {'at': 0.0, 'value': None}
+
+
+def storage_usage(max_age=60):
+    """(bytes, files) of stored uploads, recomputed at most every max_age seconds"""
+    if _usage['value'] is None or time.time() - _usage['at'] > max_age:
+        size = count = 0
+        for stored in storage.list('uploads/'):
+            size += stored.size
+            count += 1
+        _usage.update(at=time.time(), value=(size, count))
+    return _usage['value']
+
+
+def human_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
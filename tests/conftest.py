@@ -0,0 +1,49 @@
+"""
+Shared fixtures: the app against a small synthetic dataset.
+
+Configuration is read when `app` is imported, so the session fixture
+points DATABASE_URL at a temporary database first. DATABASE_REPLICA_URL
+points at a snapshot of it taken once the dataset is built: a replica that
+never catches up, for the read-routing tests.
+"""
+import os
+import sys
+import sqlite3
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Projects in the dataset; query budgets must hold whatever the size
+SCALE = '40'
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('data')
+    database, replica = directory / 'portfolio.db', directory / 'replica.db'
+    # Jobs stay queued: run inline, the upload sweep would delete every upload
+    # the synthetic rows don't reference
+    os.environ.update(DATABASE_URL=f'sqlite:///{database}', DATABASE_REPLICA_URL=f'sqlite:///{replica}',
+                      JOBS_INLINE='0')
+
+    from app import app
+    from benchmarks.datasets import build_dataset
+
+    build_dataset(app, SCALE)
+    # Engines connect lazily, so the snapshot can be taken after the build
+    with sqlite3.connect(database) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+    return app
+
+
+@pytest.fixture
+def catch_up_seconds():
+    """Set DATABASE_REPLICA_CATCH_UP_SECONDS for one test"""
+    from database import engine_profiles
+
+    original = engine_profiles.catch_up_seconds
+
+    def set_catch_up(seconds):
+        engine_profiles.catch_up_seconds = seconds
+    yield set_catch_up
+    engine_profiles.catch_up_seconds = original
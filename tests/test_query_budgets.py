@@ -0,0 +1,22 @@
+"""Every route within its @query_budget, and public queries on indexes (see `python -m benchmarks`)"""
+import pytest
+from benchmarks import driver
+
+
+@pytest.fixture(autouse=True)
+def primary_only(catch_up_seconds):
+    # The statement counters listen on the primary engine: keep reads there
+    catch_up_seconds(float('inf'))
+
+
+def test_routes_stay_within_query_budgets(app):
+    checks = driver.check_budgets(app)
+    assert checks
+    failures = [check for check in checks if check['status'] >= 400 or check['statements'] > check['budget']]
+    assert failures == []
+
+
+def test_public_queries_use_indexes(app):
+    plans = driver.explain_public_queries(app)
+    assert plans
+    assert [(statement, full_scans) for statement, _, full_scans in plans if full_scans] == []
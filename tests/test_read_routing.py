@@ -0,0 +1,49 @@
+"""Read-your-writes with a read replica (DATABASE_REPLICA_URL)"""
+import pytest
+from flask import g, session
+from benchmarks import driver
+from database import engine_profiles
+from models import Publication
+
+TITLE = 'Written after the replica snapshot'
+
+
+@pytest.fixture
+def written(app):
+    """Id of a publication on the primary that the replica doesn't have"""
+    admin = driver.login(app.test_client())
+    admin.post('/admin/publications/new', data={'title': TITLE, 'journal': 'J', 'publication_date': '2025-02-01',
+                                                'authors': 'A', 'url': 'https://example.com'}).close()
+    with app.app_context():
+        publication_id = Publication.query.filter_by(title=TITLE).one().id
+    yield publication_id
+    admin.post(f'/admin/publications/{publication_id}/delete').close()
+
+
+def _read(app, admin=False):
+    """(routed to the replica, the written publication is visible) for a public GET"""
+    with app.test_request_context('/'):
+        if admin:
+            session['admin_logged_in'] = True
+        engine_profiles.route_to_replica()
+        return bool(g.get('read_replica')), Publication.query.filter_by(title=TITLE).first() is not None
+
+
+def test_reads_stay_on_primary_while_a_write_replicates(app, written):
+    assert engine_profiles.replicating()
+    assert _read(app) == (False, True)
+
+
+def test_reads_use_replica_once_caught_up(app, written, catch_up_seconds):
+    catch_up_seconds(0)
+    assert _read(app) == (True, False)
+
+
+def test_admin_reads_stay_on_primary(app, written, catch_up_seconds):
+    catch_up_seconds(0)
+    assert _read(app, admin=True) == (False, True)
+
+
+def test_pages_cached_after_an_edit_show_it(app):
+    checks = driver.check_replica_freshness(app)
+    assert [check for check, passed in checks if not passed] == []
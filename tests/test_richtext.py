@@ -0,0 +1,23 @@
+"""Render-at-write rich text (richtext.to_html)"""
+import pytest
+from richtext import to_html
+
+
+@pytest.mark.parametrize('source, html', [
+    ('One\ntwo\n\nThree', '<p>One<br>two</p>\n<p>Three</p>'),
+    ('- a\n- b', '<ul><li>a</li><li>b</li></ul>'),
+    ('1. a\n2. b', '<ol><li>a</li><li>b</li></ol>'),
+    ('**bold**, *it* and _it_', '<p><strong>bold</strong>, <em>it</em> and <em>it</em></p>'),
+    ('`**not bold**`', '<p><code>**not bold**</code></p>'),
+    ('<script>', '<p>&lt;script&gt;</p>'),
+    ('[site](/about)', '<p><a href="/about">site</a></p>'),
+    ('[x](javascript:alert(1))', '<p>[x](javascript:alert(1))</p>'),
+    # Emphasis markers in a URL are part of it
+    ('[docs](https://example.com/a_b_c/_d_)',
+     '<p><a href="https://example.com/a_b_c/_d_" target="_blank" rel="noopener noreferrer">docs</a></p>'),
+    ('[img](/static/*x*.png)', '<p><a href="/static/*x*.png">img</a></p>'),
+    # ... but still apply to the link text and around the link
+    ('**see [the _docs_](/a_b_)**', '<p><strong>see <a href="/a_b_">the <em>docs</em></a></strong></p>'),
+])
+def test_to_html(source, html):
+    assert to_html(source) == html
@@ -0,0 +1,122 @@
+"""
+Content-addressed upload store.
+
+Uploads are stored once under their SHA-256 digest
+(uploads/cas/ab/<digest>.<ext> in the configured storage backend), so
+saving the same image twice leaves one copy: the stream is read once,
+hashed as it is staged in a temporary file, and the staged file becomes
+the blob only if that blob doesn't exist yet. Blobs are reference-counted from
+Project.preview_image_path, ProjectImage.image_path and CV.file_path;
+`release` deletes a file (and its image variants) once nothing refers to
+it. Because a blob's name is its content, it is served with the digest as
+a strong ETag and an immutable Cache-Control.
+
+Gallery uploads go through `ingest_images`, which stores files on a
+bounded thread pool so a multi-image POST waits for the slowest file
+rather than the sum of all of them. Resized variants are generated later
+by the 'image-variants' background job.
+"""
+import os
+import time
+import hashlib
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from models import Project, ProjectImage, CV
+from images import variant_files
+from storage import storage
+
+logger = logging.getLogger(__name__)
+
+CAS_DIR = 'uploads/cas'
+
+
+def blob_path(digest, extension):
+    return f"{CAS_DIR}/{digest[:2]}/{digest}.{extension}"
+
+
+def store_upload(file):
+    """Store an uploaded FileStorage by content; returns its path (uploads/cas/...)"""
+    return _store(file)[0]
+
+
+def _store(file):
+    """(path, created): created is False when the blob was already stored"""
+    extension = file.filename.rsplit('.', 1)[1].lower()
+    # An existing blob is touched, restarting the sweeper's grace period: it
+    # may be unreferenced right now and is about to be referenced again
+    return storage.save_hashed(file.stream, CAS_DIR, lambda digest: blob_path(digest, extension),
+                               hashlib.sha256(), content_type=file.mimetype)
+
+
+IngestedImage = namedtuple('IngestedImage', 'filename path created seconds')
+
+
+def ingest_image(file):
+    """Store one upload; the IngestedImage can be passed to `discard()` if its row isn't saved"""
+    started = time.perf_counter()
+    path, created = _store(file)
+    return IngestedImage(file.filename, path, created, time.perf_counter() - started)
+
+
+def ingest_images(app, files):
+    """Store uploads concurrently
+
+    Returns IngestedImage tuples in upload order. If any file fails, the
+    blobs this call created are removed before the error propagates.
+    """
+    if not files:
+        return []
+    workers = max(1, min(len(files), app.config['GALLERY_INGEST_WORKERS']))
+    ingested, error = [], None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(ingest_image, file) for file in files]:
+            try:
+                ingested.append(future.result())
+            except Exception as e:
+                error = error or e
+    if error is not None:
+        discard(ingested)
+        raise error
+    return ingested
+
+
+def discard(ingested):
+    """Remove files written for images whose rows never reached the database"""
+    for image in ingested:
+        if not image.created:
+            continue
+        _delete([image.path] + variant_files(image.path))
+
+
+def reference_count(path):
+    """Number of rows pointing at a stored path"""
+    return (Project.query.filter_by(preview_image_path=path).count()
+            + ProjectImage.query.filter_by(image_path=path).count()
+            + CV.query.filter_by(file_path=path).count())
+
+
+def release(*paths):
+    """Delete uploads (and their variants) that are no longer referenced
+
+    Call after the commit that dropped the reference. Files outside
+    uploads/ (e.g. the graphics/ defaults) are never touched.
+    """
+    for path in set(paths):
+        if not path or not path.startswith('uploads/') or reference_count(path):
+            continue
+        _delete([path] + variant_files(path))
+
+
+def _delete(paths):
+    # Best effort: anything left behind is collected by the sweeper
+    for path in paths:
+        try:
+            storage.delete(path)
+        except Exception as e:
+            logger.warning('Could not delete %s: %s', path, e)
+
+
+def blob_digest(filename):
+    """Digest from a cas/ filename like ab/<digest>.png"""
+    return os.path.splitext(os.path.basename(filename))[0]
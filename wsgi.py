@@ -0,0 +1,18 @@
+"""
+WSGI entry point for gunicorn.
+
+The database is bootstrapped once here (with preload_app, see gunicorn.conf.py,
+once in the master before workers fork) instead of on the first homepage
+request. How long loading took is logged at startup.
+"""
+import time
+import logging
+
+_started = time.perf_counter()
+
+from app import app, init_db
+
+_imported = time.perf_counter()
+init_db()
+logging.getLogger('gunicorn.error').info('App imported in %.2fs, database bootstrapped in %.2fs',
+                                         _imported - _started, time.perf_counter() - _imported)